@@ -3,4 +3,10 @@ Ocean Analysis Package
 A multi-agent system for oceanographic data analysis
 """
 
-__version__ = '0.1.0' 
\ No newline at end of file
+import logging
+
+__version__ = '0.1.0'
+
+# Por defecto solo WARNING hacia arriba: los agentes loguean por archivo
+# en caminos calientes y el formateo INFO por defecto tiene costo
+logging.getLogger(__name__).setLevel(logging.WARNING) 
\ No newline at end of file
@@ -1,21 +1,62 @@
-from langchain.agents import Agent, AgentExecutor
-from langchain.chains import LLMChain
-import numpy as np
-import xarray as xr
+import asyncio
 
 class OceanographicAgentSystem:
-    def __init__(self):
+    def __init__(self, max_concurrency: int = 4):
         self.supervisor_agent = SupervisorAgent()
         self.parser_agent = ParserAgent()
         self.qa_agent = QualityAnalysisAgent()
         self.stats_agent = StatisticalAgent()
         self.report_agent = ReportGenerationAgent()
+        # Límite de concurrencia para llamadas LLM/red (2-8 recomendado)
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
 
     async def process_dataset(self, data_path: str):
-        # Flujo de trabajo coordinado
+        # Flujo de trabajo coordinado: el parser debe completarse primero,
+        # pero el QA se ejecuta en paralelo por estación y las etapas de
+        # estadística/reporte se solapan donde no hay dependencia de datos
         raw_data = await self.parser_agent.parse(data_path)
-        qa_results = await self.qa_agent.analyze(raw_data)
-        stats = await self.stats_agent.compute_statistics(qa_results)
-        report = await self.report_agent.generate_report(stats)
-        
-        return await self.supervisor_agent.review(report) 
\ No newline at end of file
+
+        # QA concurrente por estación (limitado por el semáforo)
+        chunks = self._split_by_station(raw_data)
+        qa_chunks = await asyncio.gather(
+            *[self._bounded(self.qa_agent.analyze(chunk)) for chunk in chunks]
+        )
+        qa_results = self._merge_qa_results(qa_chunks)
+
+        # Estadísticas y esqueleto del reporte no dependen entre sí
+        stats, report_skeleton = await asyncio.gather(
+            self.stats_agent.compute_statistics(qa_results),
+            self.report_agent.generate_report_skeleton(qa_results)
+        )
+
+        # El reporte final y la revisión del supervisor se solapan:
+        # el supervisor comienza con el esqueleto mientras se completa el cuerpo
+        report_task = asyncio.create_task(
+            self.report_agent.generate_report(stats, skeleton=report_skeleton)
+        )
+        await self.supervisor_agent.prepare_review(report_skeleton)
+        report = await report_task
+
+        return await self.supervisor_agent.review(report)
+
+    async def _bounded(self, coro):
+        """Ejecuta una corrutina respetando el límite de concurrencia"""
+        async with self._semaphore:
+            return await coro
+
+    def _split_by_station(self, raw_data):
+        """Divide los datos crudos en fragmentos por estación para QA paralelo"""
+        stations = raw_data.get('stations') if isinstance(raw_data, dict) else None
+        if not stations:
+            return [raw_data]
+        return [raw_data['stations'][s] for s in stations]
+
+    def _merge_qa_results(self, qa_chunks):
+        """Combina los resultados de QA de cada estación"""
+        if len(qa_chunks) == 1:
+            return qa_chunks[0]
+        merged = {}
+        for chunk in qa_chunks:
+            merged.update(chunk)
+        return merged
@@ -1,100 +1,198 @@
+import os
 import pandas as pd
 import numpy as np
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as pa_ds
 from pathlib import Path
-from typing import Dict, Any, List, Optional, Generator
+from typing import Dict, Any, AsyncGenerator, List, Optional
+import asyncio
 import logging
 from tqdm import tqdm
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
 import time
 
+@dataclass(frozen=True)
+class ParserConfig:
+    """Configuración congelada del parser (acceso por atributo, sin hashing de dict)"""
+    variables: tuple = ('temperature', 'salinity', 'pressure', 'latitude', 'longitude')
+    units: Dict[str, str] = field(default_factory=lambda: {
+        'temperature': '°C',
+        'salinity': 'PSU',
+        'pressure': 'dbar',
+        'latitude': '°N',
+        'longitude': '°E'
+    })
+    encoding: str = 'utf-8'
+    delimiter: str = ','
+    decimal: str = '.'
+    na_values: tuple = ('NA', 'NaN', '', ' ')
+    sentinel_values: tuple = (-999.0, -9999.0)  # Centinelas numéricos de faltantes
+    batch_size: int = 1000  # Tamaño predeterminado del lote
+    max_workers: int = os.cpu_count() or 4  # Arrow libera el GIL, usar todos los cores
+
+# Pool de procesos compartido para el parseo (CPU-bound, evita el GIL).
+# Se crea de forma perezosa para no pagar el fork al importar el módulo.
+_parse_pool: Optional[ProcessPoolExecutor] = None
+
+def _get_parse_pool(max_workers: int) -> ProcessPoolExecutor:
+    global _parse_pool
+    if _parse_pool is None:
+        _parse_pool = ProcessPoolExecutor(max_workers=max_workers)
+    return _parse_pool
+
 class ParserAgent:
     """Agente para parsear y validar datos oceanográficos"""
     
     def __init__(self):
         self.logger = logging.getLogger(__name__)
-        self.config = {
-            'variables': ['temperature', 'salinity', 'pressure', 'latitude', 'longitude'],
-            'units': {
-                'temperature': '°C',
-                'salinity': 'PSU',
-                'pressure': 'dbar',
-                'latitude': '°N',
-                'longitude': '°E'
-            },
-            'encoding': 'utf-8',
-            'delimiter': ',',
-            'decimal': '.',
-            'na_values': ['NA', 'NaN', '', ' '],
-            'batch_size': 1000,  # Tamaño predeterminado del lote
-            'max_workers': 4     # Número máximo de workers para procesamiento paralelo
-        }
+        self.config = ParserConfig()
         self.data_path = None
         
-    def process_in_batches(self, file_list: List[Path], batch_size: Optional[int] = None) -> Generator[Dict[str, Any], None, None]:
+    async def process_in_batches(self, file_list: List[Path], batch_size: Optional[int] = None) -> AsyncGenerator[Dict[str, Any], None]:
         """
-        Procesa una lista de archivos en lotes
-        
+        Procesa una lista de archivos en lotes sin bloquear el event loop
+
+        Cada lote completo se despacha como una sola tarea al pool de
+        procesos: dentro del worker, _process_batch lee el lote entero
+        con un único escaneo de pyarrow.dataset (paralelo en C++) y solo
+        cae al parseo archivo por archivo si los esquemas del lote son
+        heterogéneos. El event loop sigue atendiendo al resto de agentes
+        mientras tanto.
+
         Args:
             file_list: Lista de rutas a los archivos CTD
             batch_size: Tamaño opcional del lote (usa el valor de config si no se especifica)
-            
+
         Yields:
             Diccionario con datos procesados para cada lote
         """
-        batch_size = batch_size or self.config['batch_size']
+        batch_size = batch_size or self.config.batch_size
         total_files = len(file_list)
-        
-        self.logger.info(f"Iniciando procesamiento por lotes de {total_files} archivos")
-        self.logger.info(f"Tamaño de lote: {batch_size}")
-        
+
+        self.logger.info("Iniciando procesamiento por lotes de %d archivos", total_files)
+        self.logger.info("Tamaño de lote: %d", batch_size)
+
+        loop = asyncio.get_running_loop()
+        pool = _get_parse_pool(self.config.max_workers)
+
         # Crear barra de progreso
-        with tqdm(total=total_files, desc="Procesando archivos") as pbar:
+        with tqdm(total=total_files, desc="Procesando archivos", mininterval=0.5) as pbar:
             for i in range(0, total_files, batch_size):
                 batch = file_list[i:i + batch_size]
                 try:
-                    # Procesar lote actual
-                    batch_results = self._process_batch(batch)
-                    
+                    # Un escaneo de dataset por lote en el pool de procesos
+                    batch_results = await loop.run_in_executor(
+                        pool, self._process_batch, batch
+                    )
+
                     # Actualizar progreso
                     pbar.update(len(batch))
-                    
+
                     yield batch_results
-                    
+
                 except Exception as e:
-                    self.logger.error(f"Error procesando lote {i//batch_size}: {str(e)}")
+                    self.logger.error("Error procesando lote %d: %s", i // batch_size, e)
                     continue
     
     def _process_batch(self, batch: List[Path]) -> Dict[str, Any]:
         """
-        Procesa un lote de archivos en paralelo
-        
+        Procesa un lote de archivos con un único escaneo de dataset
+
+        pyarrow.dataset lee todos los archivos del lote en paralelo en C++
+        con proyección de columnas, evitando abrir/tokenizar archivo por
+        archivo desde Python. Si el escaneo falla (esquemas heterogéneos),
+        se cae al procesamiento por archivo.
+
         Args:
             batch: Lista de archivos a procesar
-            
+
         Returns:
             Diccionario con datos combinados del lote
         """
-        results = []
-        
-        with ThreadPoolExecutor(max_workers=self.config['max_workers']) as executor:
-            # Crear futures para cada archivo
-            future_to_file = {
-                executor.submit(self._process_single_file, file): file 
-                for file in batch
+        # Los NetCDF no pasan por el escaneo CSV del dataset: un lote
+        # que los incluya se procesa archivo por archivo directamente
+        if any(p.suffix == '.nc' for p in batch):
+            return self._process_batch_per_file(batch)
+
+        try:
+            fmt = pa_ds.CsvFileFormat(
+                parse_options=pa_csv.ParseOptions(
+                    delimiter=self.config.delimiter
+                ),
+                convert_options=pa_csv.ConvertOptions(
+                    null_values=self.config.na_values
+                )
+            )
+            dataset = pa_ds.dataset([str(p) for p in batch], format=fmt)
+            available = [v for v in self.config.variables
+                         if v in dataset.schema.names]
+            table = dataset.to_table(columns=available)
+
+            combined = {}
+            for var in self.config.variables:
+                if var in available:
+                    values = np.asarray(table.column(var))
+                    if var not in ('latitude', 'longitude'):
+                        values = values.astype(np.float32, copy=False)
+                    combined[var] = self._mask_sentinels(values)
+                else:
+                    # Largo consistente con el resto del lote: NaN float
+                    # en vez de un array vacío desalineado
+                    self.logger.warning("Variable %s no encontrada en el lote", var)
+                    combined[var] = np.full(table.num_rows, np.nan)
+
+            if 'pressure' in combined:
+                combined['depth'] = -1 * combined['pressure']
+
+            combined['metadata'] = {
+                'n_files': len(batch),
+                'total_samples': table.num_rows,
+                'timestamp': time.time()
             }
-            
+            return combined
+
+        except Exception as e:
+            self.logger.warning("Escaneo de dataset falló (%s), procesando por archivo", e)
+            return self._process_batch_per_file(batch)
+
+    def _process_batch_per_file(self, batch: List[Path]) -> Dict[str, Any]:
+        """
+        Procesa un lote de archivos en paralelo, archivo por archivo
+
+        Camino de respaldo del escaneo de dataset (esquemas heterogéneos
+        o NetCDF en el lote). Corre dentro del worker del pool de
+        procesos; los hilos sirven porque pyarrow y xarray liberan el
+        GIL durante la lectura.
+
+        Args:
+            batch: Lista de archivos a procesar
+
+        Returns:
+            Diccionario con datos combinados del lote
+        """
+        # Ranuras preasignadas: cada worker escribe en su índice, sin
+        # crecimiento de lista compartida ni reordenamiento por llegada
+        results: List[Optional[Dict[str, Any]]] = [None] * len(batch)
+
+        with ThreadPoolExecutor(max_workers=self.config.max_workers) as executor:
+            # Crear futures para cada archivo, recordando su posición
+            future_to_slot = {
+                executor.submit(self._process_single_file, file): (i, file)
+                for i, file in enumerate(batch)
+            }
+
             # Recolectar resultados a medida que se completan
-            for future in as_completed(future_to_file):
-                file = future_to_file[future]
+            for future in as_completed(future_to_slot):
+                i, file = future_to_slot[future]
                 try:
-                    data = future.result()
-                    results.append(data)
+                    results[i] = future.result()
                 except Exception as e:
-                    self.logger.error(f"Error procesando archivo {file}: {str(e)}")
+                    self.logger.error("Error procesando archivo %s: %s", file, e)
                     continue
-        
-        # Combinar resultados del lote
-        return self._combine_batch_results(results)
+
+        # Combinar resultados del lote (escritura directa a buffers preasignados)
+        return self._combine_batch_results([r for r in results if r is not None])
     
     def _process_single_file(self, file_path: Path) -> Dict[str, Any]:
         """
@@ -107,40 +205,143 @@ class ParserAgent:
             Diccionario con datos procesados
         """
         try:
-            # Leer y procesar archivo
-            df = pd.read_csv(
-                file_path,
-                encoding=self.config['encoding'],
-                delimiter=self.config['delimiter'],
-                decimal=self.config['decimal'],
-                na_values=self.config['na_values']
-            )
-            
-            # Extraer variables
+            # Los NetCDF ya son binarios: leerlos directo con xarray evita
+            # todo el camino de parseo de texto CSV
+            if file_path.suffix == '.nc':
+                columns, n_samples = self._read_netcdf(file_path)
+            else:
+                # Leer con pyarrow (parser C++ multihilo, no retiene el GIL)
+                columns, n_samples = self._read_columns(file_path)
+
+            # Extraer variables; los datos CTD (~4 cifras significativas)
+            # van en float32 (mitad de ancho de banda en cada reducción
+            # posterior); lat/lon conservan float64 por precisión geodésica
             data = {}
-            for var in self.config['variables']:
-                if var in df.columns:
-                    data[var] = df[var].values
+            for var in self.config.variables:
+                if var in columns:
+                    values = columns[var]
+                    if var not in ('latitude', 'longitude'):
+                        values = np.asarray(values).astype(np.float32, copy=False)
+                    data[var] = self._mask_sentinels(values)
                 else:
-                    self.logger.warning(f"Variable {var} no encontrada en {file_path}")
+                    self.logger.warning("Variable %s no encontrada en %s", var, file_path)
                     data[var] = np.array([])
-            
+
             # Convertir presión a profundidad
             if 'pressure' in data:
                 data['depth'] = -1 * data['pressure']
-            
+
             # Agregar metadata
             data['metadata'] = {
                 'source_file': str(file_path),
-                'n_samples': len(df),
+                'n_samples': n_samples,
                 'timestamp': time.time()
             }
-            
+
             return data
-            
+
         except Exception as e:
-            self.logger.error(f"Error procesando archivo {file_path}: {str(e)}")
+            self.logger.error("Error procesando archivo %s: %s", file_path, e)
             raise
+
+    def _read_netcdf(self, file_path: Path) -> tuple:
+        """
+        Lee las variables de interés de un archivo NetCDF
+
+        Args:
+            file_path: Ruta al archivo NetCDF
+
+        Returns:
+            Tupla (dict columna -> np.ndarray, número de muestras)
+        """
+        import xarray as xr  # Import diferido: solo se paga si llegan .nc
+
+        with xr.open_dataset(file_path) as ds:
+            columns = {
+                var: np.ravel(ds[var].values)
+                for var in self.config.variables if var in ds
+            }
+        n_samples = max((v.shape[0] for v in columns.values()), default=0)
+        return columns, n_samples
+
+    def _mask_sentinels(self, values: np.ndarray) -> np.ndarray:
+        """
+        Reemplaza los centinelas numéricos de faltantes por NaN
+
+        Una sola pasada vectorizada sobre el array; las cadenas vacías y
+        'NA' ya se resuelven a nivel C++ con null_values al parsear.
+
+        Args:
+            values: Array de valores de una variable
+
+        Returns:
+            Array con centinelas convertidos a NaN
+        """
+        if values.size == 0 or not np.issubdtype(values.dtype, np.number):
+            return values
+        mask = np.isin(values, self.config.sentinel_values)
+        if mask.any():
+            if not np.issubdtype(values.dtype, np.floating):
+                values = values.astype(np.float32)
+            elif not values.flags.writeable:
+                # Las columnas float64 (lat/lon) llegan como vistas
+                # zero-copy de Arrow, que son de solo lectura: copiar
+                # antes de mutar
+                values = values.copy()
+            values[mask] = np.nan
+        return values
+
+    def _read_columns(self, file_path: Path) -> tuple:
+        """
+        Lee las columnas de interés de un archivo CSV
+
+        Usa pyarrow.csv (parser C++ sin pasar por pandas) y cae a
+        pd.read_csv si el esquema del archivo no es compatible.
+
+        Args:
+            file_path: Ruta al archivo CSV
+
+        Returns:
+            Tupla (dict columna -> np.ndarray, número de filas)
+        """
+        try:
+            table = pa_csv.read_csv(
+                file_path,
+                parse_options=pa_csv.ParseOptions(
+                    delimiter=self.config.delimiter
+                ),
+                convert_options=pa_csv.ConvertOptions(
+                    include_columns=self.config.variables,
+                    include_missing_columns=True,
+                    null_values=self.config.na_values
+                )
+            )
+            columns = {}
+            for name in table.column_names:
+                values = np.asarray(table.column(name))
+                if values.dtype == object:
+                    # Las columnas ausentes del archivo se materializan
+                    # como nulls (dtype object de None); coercionar a
+                    # NaN float para que las operaciones numéricas
+                    # posteriores no fallen
+                    self.logger.warning(
+                        "Variable %s no encontrada en %s", name, file_path)
+                    values = np.full(values.shape[0], np.nan)
+                columns[name] = values
+            return columns, table.num_rows
+
+        except Exception as e:
+            # Fallback: esquema no estándar, usar el parser de pandas
+            self.logger.warning("pyarrow no pudo leer %s (%s), usando pandas", file_path, e)
+            df = pd.read_csv(
+                file_path,
+                encoding=self.config.encoding,
+                delimiter=self.config.delimiter,
+                decimal=self.config.decimal,
+                na_values=self.config.na_values
+            )
+            columns = {col: df[col].values for col in df.columns}
+            return columns, len(df)
     
     def _combine_batch_results(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
@@ -162,13 +363,20 @@ class ParserAgent:
                 'timestamp': time.time()
             }
         }
-        
-        # Combinar variables
-        for var in self.config['variables']:
-            combined[var] = np.concatenate([r[var] for r in results if var in r])
-        
-        # Combinar profundidad si existe
+
+        # Combinar variables escribiendo en un buffer preasignado por
+        # variable (una sola asignación, sin copias intermedias)
+        variables = list(self.config.variables)
         if 'depth' in results[0]:
-            combined['depth'] = np.concatenate([r['depth'] for r in results if 'depth' in r])
-        
+            variables.append('depth')
+        for var in variables:
+            arrays = [r[var] for r in results if var in r]
+            buffer = np.empty(sum(a.shape[0] for a in arrays),
+                              dtype=np.result_type(*arrays))
+            offset = 0
+            for a in arrays:
+                buffer[offset:offset + a.shape[0]] = a
+                offset += a.shape[0]
+            combined[var] = buffer
+
         return combined
\ No newline at end of file
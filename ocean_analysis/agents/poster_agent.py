@@ -1,10 +1,27 @@
+import os
+import asyncio
+import tempfile
 from typing import Dict, Any, List, Optional
 import logging
 from pathlib import Path
-import matplotlib.pyplot as plt
-import seaborn as sns
+import numpy as np
 from datetime import datetime
-import matplotlib.gridspec as gridspec
+# Solo los componentes de matplotlib que se usan: pyplot arrastra todo el
+# gestor de figuras/GUI (~150-400 ms y decenas de MB) y aquí no hace falta
+from matplotlib.axes import Axes
+from matplotlib.patches import Rectangle
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from PIL import Image
+from hashlib import blake2b
+
+# Rectángulos fijos del layout del poster en fracciones de figura
+# (x, y, ancho, alto). Equivalen a la grilla 4x2 previa con
+# height_ratios=[1, 0.1, 1, 2], pero sin el solver de GridSpec
+_LAYOUT_TITLE = (0.125, 0.7355, 0.775, 0.1445)
+_LAYOUT_INTRO = (0.125, 0.4582, 0.337, 0.1445)
+_LAYOUT_METHODS = (0.563, 0.4582, 0.337, 0.1445)
+_LAYOUT_RESULTS = (0.125, 0.11, 0.775, 0.2889)
 
 class PosterAgent:
     """Agente para generación de posters científicos"""
@@ -17,6 +34,8 @@ class PosterAgent:
             'institution': 'Instituto Oceanográfico',
             'size': (16, 20),
             'dpi': 300,
+            'format': 'jpg',  # JPEG: codifica mucho más rápido que PNG a este tamaño
+            'jpeg_quality': 88,
             'style': 'default',
             'columns': 2,
             'font_family': 'sans-serif',
@@ -33,7 +52,22 @@ class PosterAgent:
             }
         }
         self.output_dir = None
-    
+        # Fondo estático del poster (encabezado, introducción y métodos)
+        # rasterizado una sola vez y reutilizado entre llamadas
+        self._bg_cache: Optional[np.ndarray] = None
+        self._bg_key = None
+        # Directorio de caché en disco para miniaturas (ver _load_thumb)
+        self._thumb_cache_dir: Optional[Path] = None
+        # Textos de sección fijos, armados una sola vez
+        self._intro_text = (
+            "• Análisis de datos oceanográficos para comprender patrones\n"
+            "• Procesamiento de perfiles CTD\n"
+            "• Identificación de masas de agua")
+        self._methods_text = (
+            "• Análisis de datos CTD\n"
+            "• Control de calidad automático\n"
+            "• Análisis estadístico multivariado")
+
     def configure(self, config: Dict[str, Any]) -> None:
         """
         Configura el agente con parámetros específicos
@@ -82,7 +116,7 @@ class PosterAgent:
                 'text_size': 12,
                 'caption_size': 10,
                 'dpi': 300,
-                'format': 'png',
+                'format': self.config.get('format', 'jpg'),
                 'margins': {
                     'side': 0.05,
                     'top': 0.95,
@@ -91,46 +125,91 @@ class PosterAgent:
                 'columns': 2
             }
             
-            # Crear figura principal
-            fig = plt.figure(figsize=(20, 28))  # Tamaño A1 aproximado
-            
-            # Definir grid para el layout
-            gs = gridspec.GridSpec(4, 2, height_ratios=[1, 0.1, 1, 2])
-            gs.update(wspace=0.3, hspace=0.4)
-            
-            # Título y autores (ocupando toda la parte superior)
-            title_ax = fig.add_subplot(gs[0, :])
-            self._add_header_section(title_ax, temp_config['title'], temp_config['authors'], temp_config)
-            title_ax.axis('off')
-            
-            # Sección de Introducción
-            intro_ax = fig.add_subplot(gs[2, 0])
-            self._add_introduction_section(intro_ax, temp_config)
-            intro_ax.axis('off')
-            
-            # Sección de Metodología
-            method_ax = fig.add_subplot(gs[2, 1])
-            self._add_methods_section(method_ax, temp_config)
-            method_ax.axis('off')
-            
-            # Sección de Resultados (ocupando todo el ancho, más abajo)
-            results_ax = fig.add_subplot(gs[3, :])
-            self._add_results_section(results_ax, results, temp_config)
+            # Caché de miniaturas persistente fuera del árbol de la
+            # sesión: el archivador barre el directorio de salida con
+            # rglob y empaquetaría los .npy internos en cada archivo
+            self._thumb_cache_dir = (Path(tempfile.gettempdir())
+                                     / 'ocean_analysis_thumb_cache')
+            self._thumb_cache_dir.mkdir(parents=True, exist_ok=True)
+
+            # Reutilizar el fondo estático rasterizado (encabezado,
+            # introducción y métodos no dependen de los resultados)
+            bg_key = (temp_config['title'], tuple(temp_config['authors']),
+                      temp_config['dpi'])
+            if self._bg_cache is None or self._bg_key != bg_key:
+                self._bg_cache = self._build_background(temp_config)
+                self._bg_key = bg_key
+
+            # Crear figura fuera de pyplot (sin gestor de figuras global
+            # ni GUI) y blitear el fondo cacheado
+            fig = Figure(figsize=(20, 28), dpi=temp_config['dpi'])  # Tamaño A1 aproximado
+            canvas = FigureCanvasAgg(fig)
+            fig.figimage(self._bg_cache, 0, 0, zorder=-1)
+
+            # Decodificar las miniaturas en paralelo (Pillow libera el
+            # GIL durante el decode) antes de la fase matplotlib, que
+            # debe seguir siendo single-thread
+            thumbs = await self._decode_thumbs(results, fig, temp_config)
+
+            # Sección de Resultados (rectángulo fijo, sin GridSpec)
+            results_ax = fig.add_axes(_LAYOUT_RESULTS)
+            self._add_results_section(results_ax, results, temp_config, thumbs)
             results_ax.axis('off')
-            
-            # Guardar poster
-            output_path = output_dir / f"poster_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-            plt.savefig(output_path, dpi=temp_config['dpi'], bbox_inches='tight', 
-                       facecolor='white', format=temp_config['format'])
-            plt.close()
-            
+
+            # Guardar poster (sin bbox 'tight' para no desalinear el fondo);
+            # JPEG progresivo: el encode zlib del PNG A1 era el cuello de botella
+            fmt = temp_config['format']
+            output_path = output_dir / f"poster_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+            pil_kwargs = {}
+            if fmt in ('jpg', 'jpeg'):
+                pil_kwargs = {'quality': self.config.get('jpeg_quality', 88),
+                              'progressive': True, 'optimize': False}
+            canvas.print_figure(output_path, dpi=temp_config['dpi'],
+                                facecolor='white', format=fmt,
+                                pil_kwargs=pil_kwargs)
+
             return output_path
             
         except Exception as e:
             self.logger.error(f"Error generando poster: {str(e)}")
             raise
     
-    def _add_header_section(self, ax: plt.Axes, title: str, authors: List[str], config: Dict[str, Any]) -> None:
+    def _build_background(self, config: Dict[str, Any]) -> np.ndarray:
+        """
+        Rasteriza una sola vez las secciones estáticas del poster
+
+        Construye encabezado, introducción y metodología en una figura
+        fuera de pyplot (sin estado global) y devuelve el buffer RGBA
+        listo para blitear con fig.figimage.
+
+        Args:
+            config: Configuración temporal del poster
+
+        Returns:
+            Array RGBA del fondo renderizado
+        """
+        fig = Figure(figsize=(20, 28), dpi=config['dpi'])
+        canvas = FigureCanvasAgg(fig)
+
+        # Título y autores (ocupando toda la parte superior)
+        title_ax = fig.add_axes(_LAYOUT_TITLE)
+        self._add_header_section(title_ax, config['title'], config['authors'], config)
+        title_ax.axis('off')
+
+        # Sección de Introducción
+        intro_ax = fig.add_axes(_LAYOUT_INTRO)
+        self._add_introduction_section(intro_ax, config)
+        intro_ax.axis('off')
+
+        # Sección de Metodología
+        method_ax = fig.add_axes(_LAYOUT_METHODS)
+        self._add_methods_section(method_ax, config)
+        method_ax.axis('off')
+
+        canvas.draw()
+        return np.asarray(canvas.buffer_rgba()).copy()
+
+    def _add_header_section(self, ax: Axes, title: str, authors: List[str], config: Dict[str, Any]) -> None:
         """Agrega sección de encabezado con título y autores"""
         margins = config['margins']
         
@@ -153,21 +232,21 @@ class PosterAgent:
         rect_y = 0.82  # Posición Y de los rectángulos
         
         # Rectángulo izquierdo
-        rect_left = plt.Rectangle((margins['side'], rect_y), 0.4, rect_height, 
+        rect_left = Rectangle((margins['side'], rect_y), 0.4, rect_height, 
                                 facecolor='black', alpha=1.0)
         ax.add_patch(rect_left)
         
         # Rect��ngulo derecho
-        rect_right = plt.Rectangle((0.5 + margins['side'], rect_y), 0.4, rect_height, 
+        rect_right = Rectangle((0.5 + margins['side'], rect_y), 0.4, rect_height, 
                                  facecolor='black', alpha=1.0)
         ax.add_patch(rect_right)
     
-    def _add_introduction_section(self, ax: plt.Axes, config: Dict[str, Any]) -> None:
+    def _add_introduction_section(self, ax: Axes, config: Dict[str, Any]) -> None:
         """Agrega sección de introducción"""
         margins = config['margins']
         
         # Título de sección con fondo azul claro
-        patch = plt.Rectangle((margins['side'], 0.82), 0.4, 0.03, 
+        patch = Rectangle((margins['side'], 0.82), 0.4, 0.03, 
                             transform=ax.transAxes, facecolor='#ADD8E6')
         ax.add_patch(patch)
         
@@ -178,26 +257,19 @@ class PosterAgent:
                 fontweight='bold',
                 color='white')
         
-        # Contenido
-        content = [
-            "• Análisis de datos oceanográficos para comprender patrones",
-            "• Procesamiento de perfiles CTD",
-            "• Identificación de masas de agua"
-        ]
-        
-        y_pos = 0.78
-        for line in content:
-            ax.text(margins['side'], y_pos, line,
-                   ha='left', va='top',
-                   fontsize=config['text_size'])
-            y_pos -= 0.03
-            
-    def _add_methods_section(self, ax: plt.Axes, config: Dict[str, Any]) -> None:
+        # Contenido: un solo artista Text multilínea (un layout y un
+        # draw en lugar de uno por viñeta)
+        ax.text(margins['side'], 0.78, self._intro_text,
+                ha='left', va='top',
+                fontsize=config['text_size'],
+                linespacing=1.8)
+
+    def _add_methods_section(self, ax: Axes, config: Dict[str, Any]) -> None:
         """Agrega sección de materiales y métodos"""
         margins = config['margins']
         
         # Título de sección con fondo azul claro
-        patch = plt.Rectangle((0.5 + margins['side'], 0.82), 0.4, 0.03,
+        patch = Rectangle((0.5 + margins['side'], 0.82), 0.4, 0.03,
                             transform=ax.transAxes, facecolor='#ADD8E6')
         ax.add_patch(patch)
         
@@ -208,26 +280,147 @@ class PosterAgent:
                 fontweight='bold',
                 color='white')
         
-        # Contenido
-        content = [
-            "• Análisis de datos CTD",
-            "• Control de calidad automático",
-            "• Análisis estadístico multivariado"
-        ]
-        
-        y_pos = 0.78
-        for line in content:
-            ax.text(0.5 + margins['side'], y_pos, line,
-                   ha='left', va='top',
-                   fontsize=config['text_size'])
-            y_pos -= 0.03
+        # Contenido en un solo artista Text multilínea
+        ax.text(0.5 + margins['side'], 0.78, self._methods_text,
+                ha='left', va='top',
+                fontsize=config['text_size'],
+                linespacing=1.8)
     
-    def _add_results_section(self, ax: plt.Axes, results: Dict[str, Any], config: Dict[str, Any]) -> None:
+    def _load_thumb(self, path: str, w_px: int, h_px: int) -> np.ndarray:
+        """
+        Decodifica una figura directamente al tamaño de miniatura
+
+        Pillow con draft() + thumbnail() evita decodificar el PNG/JPEG a
+        resolución nativa solo para encogerlo después en imshow.
+
+        Args:
+            path: Ruta a la imagen
+            w_px: Ancho objetivo en píxeles
+            h_px: Alto objetivo en píxeles
+
+        Returns:
+            Array uint8 con la miniatura
+        """
+        # Caché en disco: la clave incluye ruta, mtime y tamaño objetivo,
+        # así una figura regenerada invalida su miniatura automáticamente
+        cache_file = None
+        if self._thumb_cache_dir is not None:
+            key = blake2b(
+                f"{path}:{os.stat(path).st_mtime_ns}:{w_px}x{h_px}".encode(),
+                digest_size=16
+            ).hexdigest()
+            cache_file = self._thumb_cache_dir / f"{key}.npy"
+            if cache_file.exists():
+                return np.load(cache_file)
+
+        with Image.open(path) as img:
+            img.draft('RGB', (w_px, h_px))
+            img.thumbnail((w_px, h_px), Image.Resampling.BILINEAR)
+            thumb = np.asarray(img.convert('RGB'))
+
+        if cache_file is not None:
+            np.save(cache_file, thumb)
+        return thumb
+
+    def _results_text_bottom(self, config: Dict[str, Any], fig: Figure) -> float:
+        """
+        Posición Y donde termina el texto de resultados
+
+        El contenido y la fuente son fijos (5 líneas a text_size pt con
+        interlineado 1.2), así que el borde inferior se calcula sin forzar
+        un draw() parcial con get_window_extent.
+        """
+        n_lines = 5
+        line_frac = (config['text_size'] * 1.2 / 72.0) / fig.get_figheight()
+        return config['margins']['top'] - 0.1 - n_lines * line_frac
+
+    def _results_figure_layout(self, config: Dict[str, Any], fig: Figure) -> Dict[str, Dict[str, float]]:
+        """Posiciones y tamaños fijos de las figuras de resultados"""
+        text_bottom = self._results_text_bottom(config, fig)
+        text_margin = 0.05  # Margen de seguridad después del texto
+        return {
+            'ctd_profiles': {
+                'x': 0.08,  # Más margen izquierdo
+                'y': text_bottom - text_margin - 0.2,  # Reducido el espacio vertical
+                'width': 0.35,  # Reducido el ancho
+                'height': 0.2   # Reducida la altura
+            },
+            'ts_diagram': {
+                'x': 0.52,  # Separado del CTD profile
+                'y': text_bottom - text_margin - 0.25,  # Alineado con CTD profile
+                'width': 0.4,
+                'height': 0.25
+            },
+            'vertical_sections': {
+                'x': 0.08,  # Alineado con CTD profile
+                'y': text_bottom - text_margin - 0.55,  # Debajo de las figuras superiores
+                'width': 0.4,
+                'height': 0.25
+            },
+            'distributions': {
+                'x': 0.52,  # Alineado con TS diagram
+                'y': text_bottom - text_margin - 0.55,  # Alineado con vertical sections
+                'width': 0.4,
+                'height': 0.25
+            }
+        }
+
+    async def _decode_thumbs(self, results: Dict[str, Any], fig: Figure,
+                             config: Dict[str, Any]) -> Dict[str, np.ndarray]:
+        """
+        Decodifica las miniaturas de resultados en paralelo
+
+        Pillow libera el GIL al decodificar, así que las cuatro figuras
+        se decodifican concurrentemente en el executor por defecto.
+
+        Args:
+            results: Resultados del análisis
+            fig: Figura destino (para dimensionar en píxeles)
+            config: Configuración temporal del poster
+
+        Returns:
+            Dict nombre -> miniatura decodificada
+        """
+        if 'visualizations' not in results or 'figures' not in results['visualizations']:
+            return {}
+
+        figure_layout = self._results_figure_layout(config, fig)
+        fig_w_px = fig.get_figwidth() * fig.dpi
+        fig_h_px = fig.get_figheight() * fig.dpi
+
+        loop = asyncio.get_running_loop()
+        names, tasks = [], []
+        for name, path in results['visualizations']['figures'].items():
+            if name not in figure_layout:
+                continue
+            if not Path(path).exists():
+                self.logger.error(f"No se encuentra el archivo {path}")
+                continue
+            layout = figure_layout[name]
+            names.append(name)
+            tasks.append(loop.run_in_executor(
+                None, self._load_thumb, path,
+                int(layout['width'] * fig_w_px),
+                int(layout['height'] * fig_h_px)
+            ))
+
+        decoded = await asyncio.gather(*tasks, return_exceptions=True)
+        thumbs = {}
+        for name, thumb in zip(names, decoded):
+            if isinstance(thumb, Exception):
+                self.logger.error(f"Error decodificando figura {name}: {thumb}")
+                continue
+            thumbs[name] = thumb
+        return thumbs
+
+    def _add_results_section(self, ax: Axes, results: Dict[str, Any],
+                             config: Dict[str, Any],
+                             thumbs: Optional[Dict[str, np.ndarray]] = None) -> None:
         """Agrega sección de resultados con visualizaciones"""
         margins = config['margins']
         
         # Título de sección con fondo azul oscuro
-        patch = plt.Rectangle((0, margins['top']), 1, 0.05, transform=ax.transAxes, 
+        patch = Rectangle((0, margins['top']), 1, 0.05, transform=ax.transAxes, 
                             facecolor='#1f77b4', alpha=0.2)
         ax.add_patch(patch)
         
@@ -238,7 +431,7 @@ class PosterAgent:
                 fontweight='bold')
         
         # Texto de resultados principales en la parte superior
-        results_text = ax.text(margins['side'], margins['top'] - 0.1,
+        ax.text(margins['side'], margins['top'] - 0.1,
             "Resultados Principales:\n" +
             "• Control de Calidad: 10 muestras válidas\n" +
             "• Correlación profundidad-temperatura: -0.99\n" +
@@ -247,80 +440,49 @@ class PosterAgent:
             ha='left', va='top',
             fontsize=config['text_size'],
             transform=ax.transAxes)
-        
-        # Obtener el bbox del texto para saber dónde termina
-        bbox = results_text.get_window_extent(renderer=plt.gcf().canvas.get_renderer())
-        bbox_trans = bbox.transformed(ax.transAxes.inverted())
-        text_bottom = bbox_trans.y0  # Posición Y donde termina el texto
-        
-        # Visualizaciones
-        if 'visualizations' in results and 'figures' in results['visualizations']:
-            figures = results['visualizations']['figures']
-            fig = plt.gcf()
-            
-            # Calcular espacios disponibles
-            text_margin = 0.05  # Margen de seguridad después del texto
-            figure_spacing = 0.05  # Espacio entre figuras
-            
-            # Definir posiciones y tamaños específicos para cada figura
-            figure_layout = {
-                'ctd_profiles': {
-                    'x': 0.08,  # Más margen izquierdo
-                    'y': text_bottom - text_margin - 0.2,  # Reducido el espacio vertical
-                    'width': 0.35,  # Reducido el ancho
-                    'height': 0.2   # Reducida la altura
-                },
-                'ts_diagram': {
-                    'x': 0.52,  # Separado del CTD profile
-                    'y': text_bottom - text_margin - 0.25,  # Alineado con CTD profile
-                    'width': 0.4,
-                    'height': 0.25
-                },
-                'vertical_sections': {
-                    'x': 0.08,  # Alineado con CTD profile
-                    'y': text_bottom - text_margin - 0.55,  # Debajo de las figuras superiores
-                    'width': 0.4,
-                    'height': 0.25
-                },
-                'distributions': {
-                    'x': 0.52,  # Alineado con TS diagram
-                    'y': text_bottom - text_margin - 0.55,  # Alineado con vertical sections
-                    'width': 0.4,
-                    'height': 0.25
-                }
-            }
-            
-            # Colocar cada figura en su posición específica
-            for name, path in figures.items():
-                if name in figure_layout:
-                    layout = figure_layout[name]
-                    self.logger.info(f"Agregando figura {name} desde {path}")
-                    
-                    try:
-                        # Verificar que el archivo existe
-                        if not Path(path).exists():
-                            self.logger.error(f"No se encuentra el archivo {path}")
-                            continue
-                            
-                        ax_sub = fig.add_axes([
-                            layout['x'],
-                            layout['y'],
-                            layout['width'],
-                            layout['height']
-                        ])
-                        
-                        img = plt.imread(path)
-                        ax_sub.imshow(img)
-                        
-                        # Solo agregar título si no es ctd_profiles
-                        if name != 'ctd_profiles':
-                            ax_sub.set_title(name.replace('_', ' ').title(),
-                                           fontsize=config['caption_size'],
-                                           pad=10)
-                        ax_sub.axis('off')
-                        
-                    except Exception as e:
-                        self.logger.error(f"Error agregando figura {name}: {str(e)}")
-                        continue
-        
+
+        # Visualizaciones: las miniaturas llegan ya decodificadas (ver
+        # _decode_thumbs); si no, se decodifican en serie como respaldo
+        fig = ax.figure
+        figure_layout = self._results_figure_layout(config, fig)
+        fig_w_px = fig.get_figwidth() * fig.dpi
+        fig_h_px = fig.get_figheight() * fig.dpi
+
+        if thumbs is None:
+            thumbs = {}
+            if 'visualizations' in results and 'figures' in results['visualizations']:
+                for name, path in results['visualizations']['figures'].items():
+                    if name in figure_layout and Path(path).exists():
+                        layout = figure_layout[name]
+                        thumbs[name] = self._load_thumb(
+                            path,
+                            int(layout['width'] * fig_w_px),
+                            int(layout['height'] * fig_h_px)
+                        )
+
+        # Blitear cada miniatura directamente al lienzo: figimage evita
+        # crear un Axes completo (ticks, spines, transformaciones) por
+        # figura solo para mostrar una imagen ya rasterizada
+        for name, img in thumbs.items():
+            layout = figure_layout[name]
+            self.logger.info(f"Agregando figura {name}")
+
+            try:
+                fig.figimage(img,
+                             xo=int(layout['x'] * fig_w_px),
+                             yo=int(layout['y'] * fig_h_px),
+                             origin='upper')
+
+                # Solo agregar título si no es ctd_profiles
+                if name != 'ctd_profiles':
+                    fig.text(layout['x'] + layout['width'] / 2,
+                             layout['y'] + layout['height'] + 0.005,
+                             name.replace('_', ' ').title(),
+                             ha='center', va='bottom',
+                             fontsize=config['caption_size'])
+
+            except Exception as e:
+                self.logger.error(f"Error agregando figura {name}: {str(e)}")
+                continue
+
         ax.axis('off')
\ No newline at end of file
@@ -1,14 +1,46 @@
-import os
+from functools import singledispatch
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, TextIO
 import logging
-import markdown
-import json
-from datetime import datetime
+import time
+import numpy as np
+
+# Encabezados de tabla reutilizados (evita re-formatear los literales)
+_TABLE_HEADER_METRIC = "| Métrica | Valor |\n|---------|-------|\n"
+_TABLE_HEADER_FIELD = "| Campo | Valor |\n|-------|-------|\n"
+
+@singledispatch
+def _format_value(value: Any) -> str:
+    """Formatea un valor para su presentación en markdown
+
+    El despacho por tipo es un lookup de diccionario (singledispatch)
+    en lugar de una cadena de isinstance por celda.
+    """
+    return str(value)
+
+@_format_value.register(float)
+@_format_value.register(np.floating)
+def _(value) -> str:
+    return f"{value:.2f}"
+
+@_format_value.register(int)
+@_format_value.register(np.integer)
+@_format_value.register(bool)
+def _(value) -> str:
+    return str(value)
+
+@_format_value.register(list)
+@_format_value.register(tuple)
+def _(value) -> str:
+    return ", ".join(str(x) for x in value)
+
+@_format_value.register(dict)
+def _(value) -> str:
+    return "; ".join(f"{k}: {v}" for k, v in value.items())
 
 class ReportAgent:
     """Agente para generación de reportes en markdown"""
-    
+
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self.config = {
@@ -20,31 +52,37 @@ class ReportAgent:
             'template': 'default'
         }
         self.output_dir = None
-    
+        self._last_outdir: Optional[Path] = None
+
     def configure(self, config: Dict[str, Any]) -> None:
         """
         Configura el agente con parámetros específicos
-        
+
         Args:
             config: Diccionario con configuración
         """
         self.config.update(config)
-    
+
     def set_output_dir(self, path: Path) -> None:
         """
         Establece el directorio de salida para reportes
-        
+
         Args:
             path: Ruta al directorio de salida
         """
+        # En modo batch el directorio no cambia entre reportes: evitar
+        # el syscall de mkdir repetido
+        if path == self._last_outdir:
+            return
         self.output_dir = path
         self.output_dir.mkdir(parents=True, exist_ok=True)
-    
+        self._last_outdir = path
+
     async def generate_report(self, results: Dict[str, Any], output_dir: Path,
                              title: str = None, authors: List[str] = None) -> Path:
         """
         Genera un reporte en markdown
-        
+
         Args:
             results: Resultados del análisis
             output_dir: Directorio de salida
@@ -53,139 +91,128 @@ class ReportAgent:
         """
         try:
             self.logger.info("Iniciando generación de reporte")
-            
+
             # Actualizar configuración temporal
             temp_config = self.config.copy()
             if title:
                 temp_config['title'] = title
             if authors:
                 temp_config['authors'] = authors
-            
+
             # Establecer directorio de salida
             self.set_output_dir(output_dir)
-            
-            # Generar contenido del reporte
-            content = self._generate_markdown_content(results, temp_config)
-            
-            # Guardar reporte
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+            # Guardar reporte escribiendo directo al archivo (sin
+            # materializar el string completo en memoria)
+            # time.strftime está implementado en C y no aloca un datetime
+            timestamp = time.strftime("%Y%m%d_%H%M%S")
             report_path = self.output_dir / f"report_{timestamp}.md"
-            
+
             with open(report_path, "w", encoding="utf-8") as f:
-                f.write(content)
-            
+                self._write_markdown(results, temp_config, f)
+
             # Generar HTML si se requiere
             if temp_config['output_format'] == 'html':
+                import markdown  # Import diferido: solo se paga en la ruta HTML
+
+                content = report_path.read_text(encoding="utf-8")
                 html_content = markdown.markdown(content)
                 html_path = self.output_dir / f"report_{timestamp}.html"
-                
+
                 with open(html_path, "w", encoding="utf-8") as f:
                     f.write(html_content)
-            
+
             self.logger.info("Reporte generado exitosamente")
             return report_path
-            
+
         except Exception as e:
             self.logger.error(f"Error generando reporte: {str(e)}")
             raise
-    
+
     def _format_value(self, value: Any) -> str:
         """Formatea un valor para su presentación en markdown"""
-        if isinstance(value, (int, bool)):
-            return str(value)
-        elif isinstance(value, float):
-            return f"{value:.2f}"
-        elif isinstance(value, (list, tuple)):
-            return ", ".join(str(x) for x in value)
-        elif isinstance(value, dict):
-            return "; ".join(f"{k}: {v}" for k, v in value.items())
-        else:
-            return str(value)
-    
-    def _generate_markdown_content(self, results: Dict[str, Any], config: Dict[str, Any]) -> str:
-        """Genera el contenido del reporte en markdown"""
-        sections = []
-        
+        return _format_value(value)
+
+    def _write_markdown(self, results: Dict[str, Any], config: Dict[str, Any],
+                        fp: TextIO) -> None:
+        """Escribe el contenido del reporte en markdown a un archivo"""
+        write = fp.write
+        fmt = _format_value  # Pre-ligado: evita resolución de atributo por celda
+
         # Título y encabezado
-        sections.append(f"# {config['title']}\n")
-        sections.append(f"*Generado: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*\n")
-        if config['authors']:
-            sections.append(f"**Autores:** {', '.join(config['authors'])}*\n")
-        
+        write(f"# {config['title']}\n\n")
+        write(f"*Generado: {time.strftime('%Y-%m-%d %H:%M:%S')}*\n\n")
+        if config.get('authors'):
+            write(f"**Autores:** {', '.join(config['authors'])}*\n\n")
+
         # Metadata
         if config['include_metadata'] and 'metadata' in results:
-            sections.append("\n## Metadata\n")
-            sections.append("| Campo | Valor |")
-            sections.append("|-------|-------|")
+            write("\n## Metadata\n\n")
+            write(_TABLE_HEADER_FIELD)
             for key, value in results['metadata'].items():
-                sections.append(f"| {key} | {self._format_value(value)} |")
-        
+                write(f"| {key} | {fmt(value)} |\n")
+
         # Control de Calidad
         if 'qa' in results and 'statistics' in results['qa']:
-            sections.append("\n## Control de Calidad\n")
+            write("\n## Control de Calidad\n\n")
             for var, stats in results['qa']['statistics'].items():
                 if isinstance(stats, dict):
-                    sections.append(f"\n### {var.title()}\n")
-                    sections.append("| Métrica | Valor |")
-                    sections.append("|---------|-------|")
+                    write(f"\n### {var.title()}\n\n")
+                    write(_TABLE_HEADER_METRIC)
                     for metric, value in stats.items():
-                        sections.append(f"| {metric} | {self._format_value(value)} |")
-        
+                        write(f"| {metric} | {fmt(value)} |\n")
+
         # Estadísticas
         if config['include_stats'] and 'statistics' in results:
-            sections.append("\n## Estadísticas\n")
+            write("\n## Estadísticas\n\n")
             stats = results['statistics']
             if isinstance(stats, dict):
                 for var, var_stats in stats.items():
                     if isinstance(var_stats, dict):
-                        sections.append(f"\n### {var.title()}\n")
-                        sections.append("| Métrica | Valor |")
-                        sections.append("|---------|-------|")
+                        write(f"\n### {var.title()}\n\n")
+                        write(_TABLE_HEADER_METRIC)
                         for metric, value in var_stats.items():
-                            sections.append(f"| {metric} | {self._format_value(value)} |")
-        
+                            write(f"| {metric} | {fmt(value)} |\n")
+
         # Masas de Agua
         if 'water_masses' in results:
-            sections.append("\n## Masas de Agua\n")
+            write("\n## Masas de Agua\n\n")
             wm_results = results['water_masses']
             if isinstance(wm_results, dict):
                 if 'statistics' in wm_results:
-                    sections.append("\n### Estadísticas por Masa de Agua\n")
+                    write("\n### Estadísticas por Masa de Agua\n\n")
                     for mass, stats in wm_results['statistics'].items():
                         if isinstance(stats, dict):
-                            sections.append(f"\n#### {mass}\n")
-                            sections.append("| Métrica | Valor |")
-                            sections.append("|---------|-------|")
+                            write(f"\n#### {mass}\n\n")
+                            write(_TABLE_HEADER_METRIC)
                             for metric, value in stats.items():
-                                sections.append(f"| {metric} | {self._format_value(value)} |")
-        
+                                write(f"| {metric} | {fmt(value)} |\n")
+
         # Visualizaciones
         if config['include_plots'] and 'visualizations' in results:
-            sections.append("\n## Visualizaciones\n")
+            write("\n## Visualizaciones\n\n")
             viz_results = results['visualizations']
             if isinstance(viz_results, dict) and 'figures' in viz_results:
                 for name, path in viz_results['figures'].items():
-                    sections.append(f"\n### {name.replace('_', ' ').title()}\n")
-                    sections.append(f"![{name}]({path})\n")
-        
+                    write(f"\n### {name.replace('_', ' ').title()}\n\n")
+                    write(f"![{name}]({path})\n\n")
+
         # Referencias
         if 'research' in results:
-            sections.append("\n## Referencias\n")
+            write("\n## Referencias\n\n")
             research = results['research']
             if isinstance(research, dict):
                 if 'papers' in research:
                     for paper in research['papers']:
                         if isinstance(paper, dict):
-                            sections.append(f"\n### {paper.get('title', 'Sin título')}\n")
-                            sections.append(f"**Autores:** {', '.join(paper.get('authors', []))}\n")
-                            sections.append(f"**Año:** {paper.get('year', 'N/A')}\n")
-                            sections.append(f"**Revista:** {paper.get('journal', 'N/A')}\n")
-                            sections.append(f"**DOI:** {paper.get('doi', 'N/A')}\n")
+                            write(f"\n### {paper.get('title', 'Sin título')}\n\n")
+                            write(f"**Autores:** {', '.join(paper.get('authors', []))}\n\n")
+                            write(f"**Año:** {paper.get('year', 'N/A')}\n\n")
+                            write(f"**Revista:** {paper.get('journal', 'N/A')}\n\n")
+                            write(f"**DOI:** {paper.get('doi', 'N/A')}\n\n")
                             if 'abstract' in paper:
-                                sections.append(f"\n{paper['abstract']}\n")
-                
+                                write(f"\n{paper['abstract']}\n\n")
+
                 if 'summary' in research:
-                    sections.append("\n### Resumen de la Literatura\n")
-                    sections.append(research['summary'])
-        
-        return "\n".join(sections)
\ No newline at end of file
+                    write("\n### Resumen de la Literatura\n\n")
+                    write(research['summary'])
@@ -1,13 +1,74 @@
+import asyncio
+import logging
 import os
+import re
+from collections import OrderedDict
+from hashlib import blake2b
+from operator import itemgetter
 from typing import List, Dict, Any, Optional
+from urllib.parse import urlparse
 from datetime import datetime
-import json
 from pathlib import Path
-from tqdm import tqdm
-from tavily import TavilyClient
-import asyncio
+
 from dotenv import load_dotenv
-import logging
+from tavily import AsyncTavilyClient
+from tqdm import tqdm
+
+# orjson (C + SIMD) serializa los payloads de metadata ~5x más rápido que
+# el json de la stdlib; si no está disponible se cae a json sin cambiar
+# el formato en disco
+try:
+    import orjson
+    _HAS_ORJSON = True
+except ImportError:
+    import json
+    _HAS_ORJSON = False
+
+# Patrón de año precompilado; el grupo no capturante evita que findall
+# devuelva tuplas ('19'|'20',) y aloque una por coincidencia
+_YEAR_RE = re.compile(r'\b(?:19|20)\d{2}\b')
+
+# Dominios académicos aceptados; el chequeo por sufijo de hostname evita
+# tanto los 9 escaneos de subcadena por URL como falsos positivos tipo
+# nature.com.evil.com
+_ACADEMIC_DOMAINS = frozenset({
+    'sciencedirect.com', 'nature.com', 'springer.com',
+    'wiley.com', 'agu.org', 'ieee.org', 'jstor.org',
+    'scholar.google.com', 'researchgate.net'
+})
+
+# Tope de entradas del caché en memoria (el disco sigue siendo el
+# respaldo frío); evita que un proceso largo crezca sin límite
+_CACHE_MAX = 128
+
+def _dump_cache(results: Dict[str, Any], cache_file: Path) -> None:
+    """Serializa resultados de búsqueda al archivo de caché
+
+    El formato lo decide la extensión: .msgpack (decodifica 2-5x más
+    rápido que JSON y ocupa ~30% menos, útil para cachés grandes) o
+    .json (por defecto, legible).
+    """
+    if cache_file.suffix == '.msgpack':
+        import msgpack  # Import diferido: solo si la config lo pide
+        cache_file.write_bytes(msgpack.packb(results, datetime=True))
+    elif _HAS_ORJSON:
+        cache_file.write_bytes(
+            orjson.dumps(results, option=orjson.OPT_INDENT_2 |
+                         orjson.OPT_SERIALIZE_NUMPY)
+        )
+    else:
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+def _load_cache(cache_file: Path) -> Dict[str, Any]:
+    """Lee resultados de búsqueda desde el archivo de caché"""
+    if cache_file.suffix == '.msgpack':
+        import msgpack
+        return msgpack.unpackb(cache_file.read_bytes(), timestamp=3, raw=False)
+    if _HAS_ORJSON:
+        return orjson.loads(cache_file.read_bytes())
+    with open(cache_file, encoding='utf-8') as f:
+        return json.load(f)
 
 class ResearcherAgent:
     """Agente investigador para búsqueda de literatura científica oceanográfica"""
@@ -17,7 +78,8 @@ class ResearcherAgent:
         self.api_key = os.getenv("TAVILY_API_KEY")
         if not self.api_key:
             raise ValueError("No se encontró TAVILY_API_KEY en las variables de entorno")
-        self.client = TavilyClient(api_key=self.api_key)
+        # Cliente asíncrono: la búsqueda HTTP no bloquea el event loop
+        self.client = AsyncTavilyClient(api_key=self.api_key)
         self.cache_dir = Path("cache/research")
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         self.logger = logging.getLogger(__name__)
@@ -26,18 +88,27 @@ class ResearcherAgent:
             'min_year': 2010,
             'sort_by': 'relevance',
             'fields': ['title', 'abstract', 'authors', 'year', 'journal', 'doi'],
-            'cache_results': True
+            'cache_results': True,
+            'cache_format': 'json'  # 'msgpack' para cachés grandes
+
         }
-        self.cache = {}
-        
+        self.cache = OrderedDict()  # LRU acotado a _CACHE_MAX entradas
+        # Sufijo de clave de caché congelado: se recalcula solo cuando
+        # la configuración cambia, no en cada búsqueda
+        self._cache_key_prefix = f"{self.config['max_results']}_{self.config['min_year']}"
+
     def configure(self, config: Dict[str, Any]) -> None:
         """
         Configura el agente con parámetros específicos
-        
+
         Args:
             config: Diccionario con configuración
         """
+        # Cortocircuito: si nada cambia no se invalida el estado derivado
+        if not config or all(self.config.get(k) == v for k, v in config.items()):
+            return
         self.config.update(config)
+        self._cache_key_prefix = f"{self.config['max_results']}_{self.config['min_year']}"
     
     async def search(self, query: str) -> Dict[str, Any]:
         """
@@ -49,12 +120,26 @@ class ResearcherAgent:
         try:
             self.logger.info(f"Buscando literatura para: {query}")
             
-            # Verificar caché
-            cache_key = f"{query}_{self.config['max_results']}_{self.config['min_year']}"
-            if self.config['cache_results'] and cache_key in self.cache:
-                self.logger.info("Resultados encontrados en caché")
-                return self.cache[cache_key]
-            
+            # Verificar caché: memoria -> disco (con TTL) -> red
+            cache_key = f"{query}_{self._cache_key_prefix}"
+            cache_file = self._cache_path(cache_key)
+            if self.config['cache_results']:
+                if cache_key in self.cache:
+                    self.logger.info("Resultados encontrados en caché")
+                    self.cache.move_to_end(cache_key)
+                    return self.cache[cache_key]
+
+                # Caché en disco: un proceso frío reutiliza resultados
+                # previos en lugar de volver a consultar la red
+                if cache_file.exists():
+                    cached = _load_cache(cache_file)
+                    if self._is_cache_valid(cached):
+                        self.logger.info("Resultados encontrados en caché de disco")
+                        self._remember(cache_key, cached)
+                        return cached
+                    # Entrada vencida (TTL de 24 h): descartarla
+                    cache_file.unlink()
+
             # Simular búsqueda (reemplazar con API real)
             results = {
                 'query': query,
@@ -87,12 +172,11 @@ class ResearcherAgent:
             
             # Guardar en caché
             if self.config['cache_results']:
-                self.cache[cache_key] = results
-                
+                self._remember(cache_key, results)
+
+
                 # También guardar en disco
-                cache_file = self.cache_dir / f"{cache_key}.json"
-                with open(cache_file, 'w', encoding='utf-8') as f:
-                    json.dump(results, f, indent=2, ensure_ascii=False)
+                _dump_cache(results, cache_file)
             
             self.logger.info(f"Encontrados {len(results['papers'])} artículos relevantes")
             return results
@@ -103,7 +187,22 @@ class ResearcherAgent:
     
     async def _async_search(self, **kwargs):
         """Wrapper asíncrono para la búsqueda de Tavily"""
-        return self.client.search(**kwargs)
+        return await self.client.search(**kwargs)
+
+    async def search_many(self, queries: List[str]) -> List[Dict[str, Any]]:
+        """
+        Ejecuta varias búsquedas en paralelo
+
+        Con el cliente asíncrono las consultas HTTP se solapan, así que
+        el tiempo total es el de la consulta más lenta y no la suma.
+
+        Args:
+            queries: Lista de consultas de búsqueda
+
+        Returns:
+            Lista de resultados en el mismo orden que las consultas
+        """
+        return await asyncio.gather(*(self.search(q) for q in queries))
     
     async def _process_results(self, 
                              results: Dict[str, Any],
@@ -111,64 +210,73 @@ class ResearcherAgent:
                              min_year: int) -> Dict[str, Any]:
         """Procesa y filtra los resultados de la búsqueda"""
         
-        processed = {
+        # Validar y extraer el año en un solo paso (_check_source ya
+        # escaneó el contenido; no se repite el regex por fuente válida).
+        # Las claves de orden se normalizan a 0 al construir, así el sort
+        # usa itemgetter directo sin dict.get por comparación
+        sources = []
+        for r in results.get('results', ()):
+            year = self._check_source(r, min_year)
+            if year is None:
+                continue
+            # _check_source ya garantizó título y URL presentes:
+            # indexado directo, y un solo get de 'content' por fuente
+            content = r.get('content') or ''
+            sources.append({
+                'title': r['title'],
+                'url': r['url'],
+                'snippet': content[:300],
+                'score': r.get('score', 0),
+                'year': year
+            })
+
+        if include_citations:
+            for source in sources:
+                source['citation'] = self._format_citation(source)
+
+        # Ordenar por relevancia y año
+        sources.sort(key=itemgetter('score', 'year'), reverse=True)
+
+        return {
             'timestamp': datetime.now().isoformat(),
             'summary': results.get('answer', ''),
-            'sources': []
+            'sources': sources
         }
-        
-        for result in results.get('results', []):
-            if self._is_valid_source(result, min_year):
-                source = {
-                    'title': result.get('title', ''),
-                    'url': result.get('url', ''),
-                    'snippet': result.get('content', '')[:300],
-                    'score': result.get('score', 0),
-                    'year': self._extract_year(result.get('content', ''))
-                }
-                
-                if include_citations:
-                    source['citation'] = self._format_citation(source)
-                    
-                processed['sources'].append(source)
-        
-        # Ordenar por relevancia y año
-        processed['sources'].sort(
-            key=lambda x: (x.get('score', 0), x.get('year', 0)),
-            reverse=True
-        )
-        
-        return processed
     
-    def _is_valid_source(self, source: Dict[str, Any], min_year: int) -> bool:
-        """Verifica si una fuente cumple los criterios de validez"""
-        if not source.get('title') or not source.get('url'):
-            return False
-            
-        # Verificar dominio académico
-        url = source.get('url', '').lower()
-        academic_domains = [
-            'sciencedirect.com', 'nature.com', 'springer.com',
-            'wiley.com', 'agu.org', 'ieee.org', 'jstor.org',
-            'scholar.google.com', 'researchgate.net'
-        ]
-        if not any(domain in url for domain in academic_domains):
-            return False
-            
+    def _check_source(self, source: Dict[str, Any], min_year: int) -> Optional[int]:
+        """Valida una fuente y devuelve su año en un solo paso
+
+        Devuelve el año extraído (0 si no se encontró) cuando la fuente
+        es válida, o None si no lo es; así el llamador no repite el
+        escaneo del contenido para obtener el año.
+        """
+        # Un solo probe por clave; los defaults literales se evitan
+        title = source.get('title')
+        url = source.get('url')
+        if not title or not url:
+            return None
+
+        # Verificar dominio académico por hostname
+        host = (urlparse(url).hostname or '').lower()
+        if host not in _ACADEMIC_DOMAINS and \
+           not any(host.endswith('.' + d) for d in _ACADEMIC_DOMAINS):
+            return None
+
         # Verificar año
-        year = self._extract_year(source.get('content', ''))
+        year = self._extract_year(source.get('content') or '')
         if year and year < min_year:
-            return False
-            
-        return True
+            return None
+
+        return year or 0
+
+    def _is_valid_source(self, source: Dict[str, Any], min_year: int) -> bool:
+        """Verifica si una fuente cumple los criterios de validez"""
+        return self._check_source(source, min_year) is not None
     
     def _extract_year(self, text: str) -> Optional[int]:
         """Extrae el año de publicación del texto"""
-        import re
-        years = re.findall(r'\b(19|20)\d{2}\b', text)
-        if years:
-            return max(int(year) for year in years)
-        return None
+        years = _YEAR_RE.findall(text)
+        return max(map(int, years)) if years else None
     
     def _format_citation(self, source: Dict[str, Any]) -> str:
         """Formatea una cita en estilo APA"""
@@ -178,6 +286,23 @@ class ResearcherAgent:
         
         return f"{title} ({year}). Retrieved from {url}"
     
+    def _remember(self, cache_key: str, results: Dict[str, Any]) -> None:
+        """Inserta en el caché en memoria expulsando la entrada más vieja"""
+        self.cache[cache_key] = results
+        self.cache.move_to_end(cache_key)
+        if len(self.cache) > _CACHE_MAX:
+            self.cache.popitem(last=False)
+
+    def _cache_path(self, cache_key: str) -> Path:
+        """Ruta del archivo de caché para una clave de búsqueda
+
+        La clave se resume con blake2b para que el nombre de archivo
+        quede acotado aunque la consulta sea larga.
+        """
+        digest = blake2b(cache_key.encode('utf-8'), digest_size=8).hexdigest()
+        suffix = 'msgpack' if self.config.get('cache_format') == 'msgpack' else 'json'
+        return self.cache_dir / f"{digest}.{suffix}"
+
     def _is_cache_valid(self, cached_results: Dict[str, Any]) -> bool:
         """Verifica si los resultados en caché son válidos (menos de 24 horas)"""
         if 'timestamp' not in cached_results:
@@ -189,8 +314,11 @@ class ResearcherAgent:
     
     def _cache_results(self, results: Dict[str, Any], cache_file: Path):
         """Guarda los resultados en caché"""
-        with open(cache_file, 'w', encoding='utf-8') as f:
-            json.dump(results, f, indent=2, ensure_ascii=False)
+        _dump_cache(results, cache_file)
+
+    def _load_cached_results(self, cache_file: Path) -> Dict[str, Any]:
+        """Lee resultados previamente cacheados desde disco"""
+        return _load_cache(cache_file)
             
     async def get_related_papers(self, 
                                topic: str,
@@ -212,18 +340,18 @@ class ResearcherAgent:
         """Genera un resumen de los hallazgos principales"""
         if not papers:
             return "No se encontraron papers relevantes."
-            
-        summary = [
+
+        # Una comprensión + un join: sin append por paper
+        parts = [
             f"Resumen de investigación sobre: {topic}\n",
             f"Basado en {len(papers)} papers académicos:\n"
+        ] + [
+            f"\n{i}. {paper['title']}" +
+            (f"\n   {paper['snippet']}" if 'snippet' in paper else '')
+            for i, paper in enumerate(papers, 1)
         ]
-        
-        for i, paper in enumerate(papers, 1):
-            summary.append(f"\n{i}. {paper['title']}")
-            if 'snippet' in paper:
-                summary.append(f"   {paper['snippet']}")
-                
-        return "\n".join(summary)
+
+        return "\n".join(parts)
     
     async def export_bibliography(self,
                                 papers: List[Dict[str, Any]],
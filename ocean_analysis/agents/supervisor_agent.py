@@ -133,12 +133,26 @@ class SupervisorAgent:
                 raise FileNotFoundError(f"No se encontró el archivo de datos: {data_path}")
             
             # Configurar rutas y parámetros específicos
+            init_names = []
+            init_tasks = []
             for agent_name, agent in self.agents.items():
                 if hasattr(agent, 'set_data_path'):
                     agent.set_data_path(data_path)
-                    
+
                 if hasattr(agent, 'initialize'):
-                    await agent.initialize()
+                    init_names.append(agent_name)
+                    init_tasks.append(agent.initialize())
+
+            # Inicializar en paralelo: la latencia de arranque pasa de
+            # sum(init) a max(init) (varios initialize hacen I/O o red)
+            results = await asyncio.gather(*init_tasks, return_exceptions=True)
+            for agent_name, result in zip(init_names, results):
+                if isinstance(result, Exception):
+                    self.logger.error(f"Error inicializando agente {agent_name}: {result}")
+                    raise result
+                # Centinela para que la entrevista no re-inicialice
+                # (cada initialize puede abrir archivos o ir a la red)
+                self.agents[agent_name]._initialized = True
                     
         except Exception as e:
             self.logger.error(f"Error configurando agentes: {str(e)}")
@@ -148,21 +162,32 @@ class SupervisorAgent:
         """
         Entrevista a cada agente para verificar su preparación y configuración
         """
-        for agent_name, agent in self.agents.items():
-            self.logger.info(f"Entrevistando agente: {agent_name}")
-            
-            # Verificar configuración
-            config_status = await self._verify_agent_config(agent)
+        names = list(self.agents)
+        self.logger.info(f"Entrevistando agentes: {', '.join(names)}")
+
+        # Verificar configuraciones en paralelo, con la lista de nombres
+        # en paralelo para poder atribuir el error
+        statuses = await asyncio.gather(
+            *[self._verify_agent_config(self.agents[name]) for name in names]
+        )
+        for agent_name, config_status in zip(names, statuses):
             if not config_status:
                 raise ValueError(f"Error en configuración del agente {agent_name}")
-            
-            # Verificar inicialización
-            if hasattr(agent, 'initialize'):
-                try:
-                    await agent.initialize()
-                except Exception as e:
-                    self.logger.error(f"Error inicializando agente {agent_name}: {str(e)}")
-                    raise
+
+        # Verificar inicialización (solo si _configure_agents no la
+        # hizo ya; el costo de initialize se paga una única vez)
+        pending = [name for name in names
+                   if hasattr(self.agents[name], 'initialize')
+                   and not getattr(self.agents[name], '_initialized', False)]
+        results = await asyncio.gather(
+            *[self.agents[name].initialize() for name in pending],
+            return_exceptions=True
+        )
+        for agent_name, result in zip(pending, results):
+            if isinstance(result, Exception):
+                self.logger.error(f"Error inicializando agente {agent_name}: {result}")
+                raise result
+            self.agents[agent_name]._initialized = True
     
     async def _verify_agent_config(self, agent: Any) -> bool:
         """
@@ -364,6 +389,24 @@ class SupervisorAgent:
         else:
             return 'needs_major_revision'
     
+    async def coordinate_research(self, topics: List[str]) -> List[Dict[str, Any]]:
+        """
+        Lanza las búsquedas de literatura de varios temas en lote
+
+        Recolecta todos los temas antes del primer await y delega en
+        ResearcherAgent.search_many, que solapa las consultas HTTP.
+
+        Args:
+            topics: Temas de investigación a consultar
+
+        Returns:
+            Lista de resultados de búsqueda, uno por tema
+        """
+        topics = [t for t in topics if t]
+        if not topics:
+            return []
+        return await self.agents['researcher'].search_many(topics)
+
     async def verify_outputs(self, output_dir: Path) -> bool:
         """
         Verifica que todos los outputs necesarios estén presentes
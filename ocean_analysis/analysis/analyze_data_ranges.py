@@ -15,34 +15,51 @@ def analyze_variable_ranges(data):
         'Fosfato': 'phosphate'
     }
     
+    # Una sola pasada por columna: describe() calcula mínimo, máximo,
+    # media, mediana y percentiles juntos, en vez de seis reducciones
+    # independientes por variable (y ya ignora los NaN)
+    desc = data[list(variables.values())].describe(
+        percentiles=[0.05, 0.25, 0.5, 0.75, 0.95])
+
     print("\nRangos de variables:")
     print("-" * 50)
-    
+
     for name, var in variables.items():
-        values = data[var].dropna()
+        col = desc[var]
         print(f"\n{name}:")
-        print(f"  Mínimo: {values.min():.2f}")
-        print(f"  Máximo: {values.max():.2f}")
-        print(f"  Media: {values.mean():.2f}")
-        print(f"  Mediana: {values.median():.2f}")
-        
-        # Calcular percentiles
-        percentiles = [5, 25, 75, 95]
-        percs = np.percentile(values, percentiles)
-        for p, v in zip(percentiles, percs):
-            print(f"  Percentil {p}: {v:.2f}")
+        print(f"  Mínimo: {col['min']:.2f}")
+        print(f"  Máximo: {col['max']:.2f}")
+        print(f"  Media: {col['mean']:.2f}")
+        print(f"  Mediana: {col['50%']:.2f}")
+        for p in (5, 25, 75, 95):
+            print(f"  Percentil {p}: {col[f'{p}%']:.2f}")
 
 def plot_ts_diagram(data):
     """
     Crear diagrama T-S coloreado por oxígeno
+
+    En lugar de un marcador por observación (que para miles de puntos
+    se solapan casi todos), se pre-binea el plano T-S en una grilla de
+    200x200 celdas con el oxígeno medio por celda y se pinta con un
+    único imshow: un blit de ~40k celdas en vez de n_points artistas.
     """
+    sal = data['salinity [PSU]'].to_numpy(dtype=np.float64)
+    temp = data['Pot. Temp. [ºC]'].to_numpy(dtype=np.float64)
+    o2 = data['O2[umol/kg]'].to_numpy(dtype=np.float64)
+    ok = np.isfinite(sal) & np.isfinite(temp) & np.isfinite(o2)
+    sal, temp, o2 = sal[ok], temp[ok], o2[ok]
+
+    counts, xe, ye = np.histogram2d(sal, temp, bins=200)
+    o2_sum, _, _ = np.histogram2d(sal, temp, bins=[xe, ye], weights=o2)
+    with np.errstate(invalid='ignore'):
+        o2_mean = np.where(counts > 0, o2_sum / counts, np.nan)
+
     plt.figure(figsize=(10, 8))
-    scatter = plt.scatter(data['salinity [PSU]'], 
-                         data['Pot. Temp. [ºC]'],
-                         c=data['O2[umol/kg]'], 
-                         cmap='viridis', 
-                         alpha=0.6)
-    plt.colorbar(scatter, label='Oxígeno [μmol/kg]')
+    img = plt.imshow(o2_mean.T,
+                     extent=[xe[0], xe[-1], ye[0], ye[-1]],
+                     origin='lower', aspect='auto',
+                     interpolation='nearest', cmap='viridis')
+    plt.colorbar(img, label='Oxígeno [μmol/kg]')
     plt.xlabel('Salinidad [PSU]')
     plt.ylabel('Temperatura Potencial [°C]')
     plt.title('Diagrama T-S coloreado por Oxígeno')
@@ -56,18 +73,23 @@ def analyze_correlations(data):
     """
     variables = ['Pot. Temp. [ºC]', 'salinity [PSU]', 'O2[umol/kg]',
                 'silicate', 'nitrate', 'phosphate']
-    
-    corr = data[variables].corr()
-    
+
+    # El filtro |corr| > 0.5 se hace sobre el triángulo superior
+    # extraído de una vez, sin k²/2 accesos .iloc de pandas. Se mantiene
+    # DataFrame.corr() porque maneja NaN por pares (los nutrientes
+    # suelen tener huecos); np.corrcoef los propagaría
+    corr = data[variables].corr().to_numpy()
+
+    iu = np.triu_indices_from(corr, k=1)
+    vals = corr[iu]
+    mask = np.abs(vals) > 0.5  # Solo mostrar correlaciones significativas
+
     print("\nCorrelaciones importantes:")
     print("-" * 50)
-    
-    for i in range(len(variables)):
-        for j in range(i+1, len(variables)):
-            corr_val = corr.iloc[i, j]
-            if abs(corr_val) > 0.5:  # Solo mostrar correlaciones significativas
-                print(f"\n{variables[i]} vs {variables[j]}:")
-                print(f"  Correlación: {corr_val:.3f}")
+
+    for i, j, corr_val in zip(iu[0][mask], iu[1][mask], vals[mask]):
+        print(f"\n{variables[i]} vs {variables[j]}:")
+        print(f"  Correlación: {corr_val:.3f}")
 
 def main():
     # Leer datos
@@ -85,20 +107,25 @@ def main():
     # Analizar correlaciones
     analyze_correlations(data)
     
-    # Analizar distribución por profundidad
+    # Analizar distribución por profundidad: un solo pd.cut + groupby
+    # (agrupamiento hash en C) en vez de una máscara booleana y varias
+    # medias por cada rango
     print("\nDistribución por profundidad:")
     print("-" * 50)
-    depth_ranges = [(0, 50), (50, 100), (100, 200), (200, 500)]
-    
-    for min_d, max_d in depth_ranges:
-        mask = (data['pressure [db]'] >= min_d) & (data['pressure [db]'] < max_d)
-        n_samples = mask.sum()
-        print(f"\nProfundidad {min_d}-{max_d} m ({n_samples} muestras):")
+    bins = [0, 50, 100, 200, 500]
+
+    depth_bin = pd.cut(data['pressure [db]'], bins=bins, right=False)
+    groups = data.groupby(depth_bin, observed=False)
+    sizes = groups.size()
+    means = groups[['Pot. Temp. [ºC]', 'salinity [PSU]', 'O2[umol/kg]']].mean()
+
+    for interval, n_samples in sizes.items():
+        print(f"\nProfundidad {int(interval.left)}-{int(interval.right)} m ({n_samples} muestras):")
         if n_samples > 0:
-            depth_data = data[mask]
-            print(f"  Temperatura: {depth_data['Pot. Temp. [ºC]'].mean():.2f}°C")
-            print(f"  Salinidad: {depth_data['salinity [PSU]'].mean():.2f} PSU")
-            print(f"  Oxígeno: {depth_data['O2[umol/kg]'].mean():.2f} μmol/kg")
+            row = means.loc[interval]
+            print(f"  Temperatura: {row['Pot. Temp. [ºC]']:.2f}°C")
+            print(f"  Salinidad: {row['salinity [PSU]']:.2f} PSU")
+            print(f"  Oxígeno: {row['O2[umol/kg]']:.2f} μmol/kg")
 
 if __name__ == '__main__':
     main() 
\ No newline at end of file
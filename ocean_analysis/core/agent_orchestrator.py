@@ -1,7 +1,121 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 import asyncio
+import concurrent.futures
+from dataclasses import dataclass, field
+from datetime import datetime
 from pathlib import Path
 
+import numpy as np
+import gsw
+
+@dataclass
+class AgentPayload:
+    """Carga útil de datos entre agentes
+
+    Los ndarrays viajan por referencia dentro del proceso: encolar un
+    AgentPayload cuesta O(1) por mensaje sin copiar los datos ni
+    expandirlos a listas de Python. Para cruzar a un pool de procesos,
+    to_shared() materializa los arrays en SharedMemory una sola vez y
+    devuelve descriptores (nombre, shape, dtype) baratos de picklear;
+    from_shared() reconstruye vistas zero-copy en el proceso hijo.
+    """
+    arrays: Dict[str, np.ndarray] = field(default_factory=dict)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    def to_shared(self) -> Tuple[Dict[str, Tuple], List]:
+        """Copia los arrays a segmentos de memoria compartida
+
+        Returns:
+            (descriptores por nombre, segmentos a liberar por el emisor)
+        """
+        from multiprocessing import shared_memory
+        descriptors = {}
+        segments = []
+        for name, arr in self.arrays.items():
+            if arr.nbytes == 0:
+                # SharedMemory no admite segmentos de tamaño cero; un
+                # array vacío (p. ej. una variable ausente del parser)
+                # se reconstruye de (shape, dtype) sin segmento
+                descriptors[name] = (None, arr.shape, str(arr.dtype))
+                continue
+            shm = shared_memory.SharedMemory(create=True, size=arr.nbytes)
+            np.ndarray(arr.shape, arr.dtype, buffer=shm.buf)[...] = arr
+            segments.append(shm)
+            descriptors[name] = (shm.name, arr.shape, str(arr.dtype))
+        return descriptors, segments
+
+    @staticmethod
+    def from_shared(descriptors: Dict[str, Tuple],
+                    metadata: Dict[str, Any] = None) -> 'AgentPayload':
+        """Reconstruye un payload con vistas sobre memoria compartida"""
+        from multiprocessing import shared_memory
+        arrays = {}
+        segments = []
+        for name, (shm_name, shape, dtype) in descriptors.items():
+            if shm_name is None:
+                arrays[name] = np.empty(shape, dtype=dtype)
+                continue
+            shm = shared_memory.SharedMemory(name=shm_name)
+            segments.append(shm)
+            arrays[name] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        payload = AgentPayload(arrays=arrays, metadata=metadata or {})
+        payload._segments = segments  # mantener vivos los segmentos
+        return payload
+
+    def close(self) -> None:
+        """Cierra los mapeos locales de memoria compartida
+
+        Solo cierra los handles de este proceso; liberar los segmentos
+        (unlink) es responsabilidad del emisor que los creó.
+        """
+        for shm in getattr(self, '_segments', []):
+            shm.close()
+        self._segments = []
+
+def compute_derived_variables(data: Dict[str, Any],
+                              lat: float = -34.5,
+                              lon: float = -50) -> Dict[str, Any]:
+    """Calcula las variables derivadas TEOS-10 una sola vez por workflow
+
+    Presión, salinidad absoluta, temperatura conservativa y sigma0 son
+    polinomios no triviales; calcularlos aquí evita que cada agente de
+    la etapa paralela (analyst/water_mass/stats) repita las mismas
+    cuatro llamadas a gsw sobre los mismos arrays. Los inputs se pasan
+    contiguos en float64 para que gsw no copie internamente.
+    """
+    if 'sigma0' in data:
+        return data
+
+    temp = np.ascontiguousarray(data['temperature'], dtype=np.float64)
+    sal = np.ascontiguousarray(data['salinity'], dtype=np.float64)
+    depth = np.ascontiguousarray(data['depth'], dtype=np.float64)
+
+    # gsw itera por el último eje con lógica nd-aware: para entradas
+    # multidimensionales es más barato pasar vistas aplanadas (una sola
+    # llamada al ufunc por variable) y reponer la forma al final
+    shape = temp.shape
+    if temp.ndim > 1:
+        temp = temp.ravel()
+        sal = sal.ravel()
+        depth = depth.ravel()
+
+    pressure = gsw.p_from_z(-depth, lat)
+    sa = gsw.SA_from_SP(sal, pressure, lon, lat)
+    ct = gsw.CT_from_t(sa, temp, pressure)
+    sigma0 = gsw.sigma0(sa, ct)
+
+    if len(shape) > 1:
+        pressure = pressure.reshape(shape)
+        sa = sa.reshape(shape)
+        ct = ct.reshape(shape)
+        sigma0 = sigma0.reshape(shape)
+
+    data['pressure'] = pressure
+    data['sa'] = sa
+    data['ct'] = ct
+    data['sigma0'] = sigma0
+    return data
+
 class AgentOrchestrator:
     """
     Orquestador central para la coordinación de agentes
@@ -48,7 +162,10 @@ class AgentOrchestrator:
                 {
                     'name': 'analysis',
                     'agents': ['analyst', 'water_mass', 'stats'],
-                    'parallel': True
+                    'parallel': True,
+                    # Variables derivadas compartidas: se calculan una vez
+                    # antes de la etapa, no dentro de cada agente
+                    'preprocess': compute_derived_variables
                 },
                 {
                     'name': 'reporting',
@@ -67,7 +184,11 @@ class AgentCommunicationProtocol:
     async def send_message(sender: str, receiver: str, 
                          message_type: str, content: Any,
                          channel: asyncio.Queue):
-        """Envía mensaje entre agentes"""
+        """Envía mensaje entre agentes
+
+        content puede ser un AgentPayload: sus ndarrays se encolan por
+        referencia, sin copia ni serialización intermedia.
+        """
         message = {
             'sender': sender,
             'receiver': receiver,
@@ -89,28 +210,132 @@ class AgentCommunicationProtocol:
             channel=supervisor_queue
         )
 
+def _run_agent_sync(agent, input_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Punto de entrada síncrono para ejecutar un agente en un worker
+
+    Los agentes de la etapa de análisis son CPU puro (NNLS, gsw,
+    matplotlib); se ejecutan en procesos del pool con un event loop
+    propio por worker.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(agent.analyze(input_data))
+    finally:
+        loop.close()
+
+def _detach_shared(obj: Any, shm_arrays: List[np.ndarray]) -> Any:
+    """Copia los ndarrays del resultado que aliasen memoria compartida
+
+    El valor de retorno del worker se picklea después de cerrar los
+    segmentos; cualquier vista que el agente haya devuelto sobre los
+    arrays de entrada debe desacoplarse antes.
+    """
+    if isinstance(obj, np.ndarray):
+        if any(np.shares_memory(obj, a) for a in shm_arrays):
+            return obj.copy()
+        return obj
+    if isinstance(obj, dict):
+        return {k: _detach_shared(v, shm_arrays) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_detach_shared(v, shm_arrays) for v in obj]
+    return obj
+
+def _run_agent_shared(agent, descriptors: Dict[str, Tuple],
+                      metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Ejecuta un agente sobre un payload en memoria compartida
+
+    Reconstruye vistas zero-copy sobre los segmentos del emisor, corre
+    el agente y cierra los mapeos locales antes de devolver; el emisor
+    hace unlink de los segmentos cuando todos los workers terminaron.
+    """
+    payload = AgentPayload.from_shared(descriptors, metadata)
+    try:
+        input_data = dict(payload.metadata)
+        input_data.update(payload.arrays)
+        result = _run_agent_sync(agent, input_data)
+        return _detach_shared(result, list(payload.arrays.values()))
+    finally:
+        payload.close()
+
 class WorkflowManager:
     """
     Gestor del flujo de trabajo entre agentes
     """
-    
+
     def __init__(self, orchestrator: AgentOrchestrator):
         self.orchestrator = orchestrator
         self.current_stage = None
         self.stage_results = {}
-        
+        self._process_pool = None
+
+    def _get_process_pool(self, n_workers: int) -> concurrent.futures.ProcessPoolExecutor:
+        """Pool de procesos perezoso para las etapas paralelas"""
+        if self._process_pool is None:
+            self._process_pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=n_workers)
+        return self._process_pool
+
+    def shutdown(self) -> None:
+        """Libera el pool de procesos si fue creado"""
+        if self._process_pool is not None:
+            self._process_pool.shutdown()
+            self._process_pool = None
+
     async def execute_workflow(self, input_data: Dict[str, Any]):
         """Ejecuta el flujo de trabajo completo"""
         for stage in self.orchestrator.workflow['stages']:
             self.current_stage = stage['name']
-            
+
+            # Preprocesamiento compartido de la etapa (p. ej. gsw)
+            preprocess = stage.get('preprocess')
+            if preprocess is not None:
+                input_data = preprocess(input_data)
+
             if stage['parallel']:
-                # Ejecutar agentes en paralelo
-                tasks = [
-                    self._execute_agent(agent, input_data)
-                    for agent in stage['agents']
-                ]
-                results = await asyncio.gather(*tasks)
+                # Agentes CPU puro: bajo el GIL asyncio.gather solo los
+                # intercala. Cada uno corre en un proceso del pool y el
+                # loop espera sin bloquearse; el feedback del supervisor
+                # se resuelve de vuelta en el proceso principal
+                for agent_name in stage['agents']:
+                    await self._check_dependencies(agent_name)
+
+                loop = asyncio.get_running_loop()
+                pool = self._get_process_pool(len(stage['agents']))
+
+                # Los ndarrays viajan una sola vez a memoria compartida;
+                # cada worker mapea vistas zero-copy en lugar de recibir
+                # una copia pickleada del dict completo por tarea
+                payload = AgentPayload(
+                    arrays={k: v for k, v in input_data.items()
+                            if isinstance(v, np.ndarray)},
+                    metadata={k: v for k, v in input_data.items()
+                              if not isinstance(v, np.ndarray)})
+                descriptors, segments = payload.to_shared()
+                try:
+                    futures = [
+                        loop.run_in_executor(
+                            pool, _run_agent_shared,
+                            self.orchestrator.get_agent(agent_name),
+                            descriptors, payload.metadata)
+                        for agent_name in stage['agents']
+                    ]
+                    raw_results = await asyncio.gather(*futures)
+                finally:
+                    # Liberar los segmentos cuando todos los workers
+                    # terminaron (ellos ya cerraron sus mapeos)
+                    for shm in segments:
+                        shm.close()
+                        shm.unlink()
+
+                results = []
+                for agent_name, result in zip(stage['agents'], raw_results):
+                    feedback = await self._request_supervisor_feedback(
+                        agent_name, result)
+                    if feedback['needs_correction']:
+                        result = await self._apply_corrections(
+                            self.orchestrator.get_agent(agent_name),
+                            result, feedback)
+                    results.append(result)
             else:
                 # Ejecutar agentes secuencialmente
                 results = []
@@ -1,20 +1,30 @@
 from langchain_openai import ChatOpenAI
+import asyncio
 import os
+from functools import lru_cache
 from dotenv import load_dotenv
 from pathlib import Path
 from ocean_analysis.core.output_manager import OutputManager
 
-# Configuración del entorno
-load_dotenv()
+@lru_cache(maxsize=1)
+def _setup_environment() -> None:
+    """Carga .env y configura LangSmith una sola vez, y solo bajo demanda
 
-# Configurar variables de entorno para LangSmith
-os.environ["LANGCHAIN_TRACING_V2"] = "true"
-os.environ["LANGCHAIN_ENDPOINT"] = "https://api.smith.langchain.com"
-os.environ["LANGCHAIN_API_KEY"] = "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"
-os.environ["LANGCHAIN_PROJECT"] = "pr-indelible-cloakroom-64"
+    Hacerlo en el import obligaba a todo importador a pagar la lectura
+    del .env y la inicialización del tracer aunque nunca usara el
+    sistema de agentes. La API key de LangSmith se toma del entorno
+    (LANGCHAIN_API_KEY en el .env); nunca va en el código.
+    """
+    load_dotenv()
+    os.environ.setdefault("LANGCHAIN_TRACING_V2", "true")
+    os.environ.setdefault("LANGCHAIN_ENDPOINT", "https://api.smith.langchain.com")
+    os.environ.setdefault("LANGCHAIN_PROJECT", "pr-indelible-cloakroom-64")
 
-# Inicializar el modelo
-llm = ChatOpenAI()
+@lru_cache(maxsize=1)
+def get_llm() -> ChatOpenAI:
+    """Inicializa el modelo de forma perezosa (una sola instancia)"""
+    _setup_environment()
+    return ChatOpenAI()
 
 # Resto de las importaciones para nuestras herramientas
 from langchain.agents import Tool, AgentExecutor, AgentType
@@ -91,9 +101,10 @@ class StatsTool(BaseTool):
         return {"status": "analyzed", "stats": "statistical_results"}
 
 # Modificar la función de configuración del sistema
+@lru_cache(maxsize=1)
 def setup_ocean_analysis_system():
-    """Configurar el sistema de análisis oceanográfico"""
-    
+    """Configurar el sistema de análisis oceanográfico (cacheado)"""
+
     # Crear instancias de herramientas
     tools = [
         ParserTool(),
@@ -113,7 +124,7 @@ def setup_ocean_analysis_system():
     agent_executor = AgentExecutor.from_agent_and_tools(
         agent=AgentType.CHAT_CONVERSATIONAL_REACT_DESCRIPTION,
         tools=tools,
-        llm=llm,  # Usar el llm ya configurado
+        llm=get_llm(),  # Inicializado de forma perezosa y cacheado
         memory=memory,
         verbose=True,
         max_iterations=5
@@ -188,8 +199,8 @@ class OceanAnalysisSystem:
                 "final"
             )
             
-            # Archivar sesión
-            archive_path = self.output_manager.archive_session()
+            # Archivar sesión (en el executor, sin bloquear el loop)
+            archive_path = await self.output_manager.archive_session()
             
             return {
                 'status': 'success',
@@ -211,7 +222,7 @@ if __name__ == "__main__":
     
     # Prueba simple para verificar la conexión
     try:
-        response = llm.invoke("Hello, world!")
+        response = get_llm().invoke("Hello, world!")
         print("Respuesta del modelo:", response)
         
         # Continuar con el análisis oceanográfico
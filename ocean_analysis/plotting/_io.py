@@ -0,0 +1,43 @@
+"""Carga compartida del CSV de nutrientes para los scripts de ploteo
+
+Todos los scripts de este paquete leen el mismo CSV con
+pd.read_csv(sep=';', decimal='.', encoding='latin-1'); el tokenizado
+del CSV domina el tiempo de ejecución de estas figuras pequeñas.
+load_nut() escribe un sidecar .parquet en la primera lectura y lo
+reutiliza mientras siga más nuevo que el CSV: binario columnar, sin
+parseo de decimales ni decodificación latin-1.
+
+Nota: los nombres de columna se normalizan con str.strip(), así que
+los scripts que usan load_nut() referencian 'Station' (sin el espacio
+final que trae el encabezado del CSV).
+"""
+from pathlib import Path
+
+import pandas as pd
+
+# El motor pyarrow tokeniza el CSV en C multihilo; si no está
+# instalado se usa el parser C por defecto de pandas
+try:
+    import pyarrow  # noqa: F401
+    _CSV_KWARGS = {'engine': 'pyarrow'}
+except ImportError:
+    _CSV_KWARGS = {}
+
+
+def load_nut(csv_path: str) -> pd.DataFrame:
+    """Lee el CSV de nutrientes, cacheado como sidecar .parquet"""
+    csv_path = Path(csv_path)
+    pq = csv_path.with_suffix('.parquet')
+    if pq.exists() and pq.stat().st_mtime >= csv_path.stat().st_mtime:
+        return pd.read_parquet(pq)
+
+    df = pd.read_csv(csv_path, sep=';', decimal='.',
+                     encoding='latin-1', **_CSV_KWARGS)
+    df.columns = df.columns.str.strip()
+    try:
+        df.to_parquet(pq)
+    except (ImportError, OSError):
+        # Sin pyarrow/fastparquet o sin permiso de escritura: se sigue
+        # leyendo el CSV directamente en cada corrida
+        pass
+    return df
@@ -1,33 +1,32 @@
-import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 import os
 
+from ocean_analysis.plotting._io import load_nut
+
 # Crear directorio de salida si no existe
 os.makedirs('test_outputs', exist_ok=True)
 
-# Leer datos de nutrientes
-df = pd.read_csv("ocean_analysis/data_tests/datosgerlache_nut.csv", 
-                 sep=';', 
-                 decimal='.', 
-                 encoding='latin-1')
+# Leer datos de nutrientes (cacheados como parquet tras la primera vez)
+df = load_nut("ocean_analysis/data_tests/datosgerlache_nut.csv")
 
 # Profundidades objetivo
 target_depths = [0.5, 10, 25, 50, 100, 200, 400]
 
 # Filtrar para la estación GS1
-station_data = df[df['Station '] == 'GS1'].copy()
+station_data = df[df['Station'] == 'GS1'].copy()
 
-# Función para encontrar el índice más cercano a una profundidad objetivo
-def find_nearest_depth(pressure_values, target):
-    return (np.abs(np.array(pressure_values) - target)).argmin()
+# Función para encontrar los índices más cercanos a las profundidades
+# objetivo: una sola matriz de diferencias y un argmin por columna, en
+# vez de recorrer el perfil una vez por cada profundidad
+def nearest_indices(pressures, targets):
+    pressures = np.asarray(pressures)
+    targets = np.asarray(targets)
+    return np.abs(pressures[:, None] - targets[None, :]).argmin(axis=0)
 
 # Filtrar solo las profundidades más cercanas a las objetivo
-filtered_indices = []
 pressures = station_data['pressure [db]'].values
-for target in target_depths:
-    idx = find_nearest_depth(pressures, target)
-    filtered_indices.append(idx)
+filtered_indices = nearest_indices(pressures, target_depths)
 
 station_data = station_data.iloc[filtered_indices].copy()
 
@@ -1,10 +1,21 @@
-import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 import os
 import cartopy.crs as ccrs
 import cartopy.feature as cfeature
 
+from ocean_analysis.plotting._io import load_nut
+
+# Rasgo de tierra compartido entre los cuatro subplots: crear el
+# NaturalEarthFeature dentro de la función obligaba a releer el
+# shapefile y reproyectar las geometrías en cada llamada. Materializar
+# las geometrías aquí fuerza una única lectura por corrida.
+_LAND = cfeature.NaturalEarthFeature('physical', 'land', '10m',
+                                     edgecolor='black',
+                                     facecolor='lightgray',
+                                     alpha=1)
+_LAND_GEOMS = list(_LAND.geometries())
+
 def create_subplot_map(fig, rows, cols, index, data, parameter, title, units, cmap='YlGn'):
     """
     Crear mapa de distribución superficial para un parámetro dado como subplot
@@ -22,12 +33,8 @@ def create_subplot_map(fig, rows, cols, index, data, parameter, title, units, cm
     # Establecer límites
     ax.set_extent([lon_min, lon_max, lat_min, lat_max], crs=ccrs.PlateCarree())
 
-    # Añadir características del mapa
-    land = cfeature.NaturalEarthFeature('physical', 'land', '10m',
-                                       edgecolor='black',
-                                       facecolor='lightgray',
-                                       alpha=1)
-    ax.add_feature(land)
+    # Añadir características del mapa (rasgo compartido a nivel de módulo)
+    ax.add_feature(_LAND)
 
     # Añadir solo las etiquetas de los ejes sin ninguna grilla
     gl = ax.gridlines(draw_labels=True)
@@ -40,35 +47,43 @@ def create_subplot_map(fig, rows, cols, index, data, parameter, title, units, cm
     gl.xlines = False
     gl.ylines = False
 
+    # Coordenadas y nombres como arrays: una sola extracción vectorizada
+    # en vez de desempaquetar fila a fila con iterrows
+    lons = data['Longitude [degrees East]'].to_numpy()
+    lats = data['Latitude [degrees North]'].to_numpy()
+    names = data['Station'].str.strip().to_numpy()
+
+    # Proyectar las coordenadas una sola vez: pasar
+    # transform=ccrs.PlateCarree() a cada artista dispara una
+    # transformación pyproj por llamada; con las coordenadas ya en la
+    # proyección del eje se plotea en coordenadas de datos nativas
+    xy = projection.transform_points(ccrs.PlateCarree(), lons, lats)[:, :2]
+
     # Crear scatter plot
-    scatter = ax.scatter(data['Longitude [degrees East]'],
-                        data['Latitude [degrees North]'],
+    scatter = ax.scatter(xy[:, 0],
+                        xy[:, 1],
                         c=data[parameter],
                         cmap=cmap,
                         s=100,
                         edgecolor='black',
                         linewidth=0.5,
-                        transform=ccrs.PlateCarree(),
                         zorder=5)
 
-    # Añadir etiquetas de estaciones con nombres
-    for _, row in data.iterrows():
-        # Punto de la estación
-        ax.plot(row['Longitude [degrees East]'],
-                row['Latitude [degrees North]'],
-                'o',
-                color='blue',
-                markersize=5,
-                transform=ccrs.PlateCarree(),
-                zorder=4)
-        
-        # Etiqueta de la estación
-        ax.text(row['Longitude [degrees East]'] + 0.02,
-                row['Latitude [degrees North]'] + 0.02,
-                row['Station '].strip(),
-                fontsize=6,
-                transform=ccrs.PlateCarree(),
-                zorder=6)
+    # Puntos de las estaciones: un único artista para todos los marcadores
+    ax.scatter(xy[:, 0], xy[:, 1],
+               color='blue',
+               s=25,
+               zorder=4)
+
+    # Etiquetas de las estaciones (la proyección es equirectangular, así
+    # que el offset en grados vale igual en coordenadas proyectadas);
+    # annotate sobre coordenadas de datos evita construir un transform
+    # por etiqueta
+    offsets = np.column_stack([xy[:, 0] + 0.02, xy[:, 1] + 0.02])
+    for (x, y), name in zip(offsets, names):
+        ax.annotate(name, xy=(x, y), xycoords='data',
+                    fontsize=6,
+                    zorder=6)
 
     # Configurar etiquetas
     ax.set_xlabel('Longitud (°W)', size=12)
@@ -82,11 +97,8 @@ def create_subplot_map(fig, rows, cols, index, data, parameter, title, units, cm
 # Crear directorio de salida si no existe
 os.makedirs('test_outputs', exist_ok=True)
 
-# Leer datos
-df = pd.read_csv("ocean_analysis/data_tests/datosgerlache_nut.csv", 
-                 sep=';', 
-                 decimal='.', 
-                 encoding='latin-1')
+# Leer datos (cacheados como parquet tras la primera vez)
+df = load_nut("ocean_analysis/data_tests/datosgerlache_nut.csv")
 
 # Filtrar datos superficiales (0.5 dbar)
 surface_data = df[np.isclose(df['pressure [db]'], 0.5)].copy()
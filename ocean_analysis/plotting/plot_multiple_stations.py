@@ -1,16 +1,16 @@
-import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 import os
 
+from ocean_analysis.plotting._io import load_nut
+
 # Crear directorio de salida si no existe
 os.makedirs('test_outputs', exist_ok=True)
 
-# Leer datos de nutrientes
-df = pd.read_csv("ocean_analysis/data_tests/datosgerlache_nut.csv", 
-                 sep=';', 
-                 decimal='.', 
-                 encoding='latin-1')
+# Leer datos de nutrientes (solo las columnas que se grafican)
+df = load_nut("ocean_analysis/data_tests/datosgerlache_nut.csv")
+df = df[['Station', 'pressure [db]', 'Chl-A [ug/L]',
+         'nitrate', 'phosphate', 'silicate']]
 
 # Profundidades objetivo estándar
 standard_depths = [0.5, 10, 25, 50, 100, 200]
@@ -18,28 +18,40 @@ standard_depths = [0.5, 10, 25, 50, 100, 200]
 # Estaciones a procesar
 stations = ['GS11', 'GS15', 'GS18', 'GS20', 'GS23', 'GS26', 'GS29', 'GS34']
 
-# Crear una figura para cada estación
+# Función para encontrar los índices más cercanos a las profundidades
+# objetivo: una sola matriz de diferencias y un argmin por columna, en
+# vez de recorrer el perfil una vez por cada profundidad
+def nearest_indices(pressures, targets):
+    pressures = np.asarray(pressures)
+    targets = np.asarray(targets)
+    return np.abs(pressures[:, None] - targets[None, :]).argmin(axis=0)
+
+# Particionar el DataFrame una sola vez: groupby hace una pasada en C,
+# en vez de ocho máscaras booleanas sobre el DataFrame completo
+groups = {k: v for k, v in df.groupby('Station', sort=False)}
+
+# Una sola figura con 4 subplots reutilizada para las ocho estaciones:
+# crear y destruir la figura en cada vuelta pagaba ocho veces la
+# construcción del canvas y los ejes; ax.clear() deja los ejes listos
+# para la estación siguiente
+fig, (ax1, ax2, ax3, ax4) = plt.subplots(1, 4, figsize=(16, 6))
+
 for station in stations:
     # Filtrar datos para la estación
-    station_data = df[df['Station '] == station].copy()
-    
-    # Función para encontrar el índice más cercano a una profundidad objetivo
-    def find_nearest_depth(pressure_values, target):
-        return (np.abs(np.array(pressure_values) - target)).argmin()
-
-    # Filtrar solo las profundidades más cercanas a las objetivo
-    filtered_indices = []
+    if station not in groups:
+        print(f"Estación {station} sin datos, se omite")
+        continue
+    station_data = groups[station].copy()
+
+    # Filtrar solo las profundidades más cercanas a las estándar
     pressures = station_data['pressure [db]'].values
-    
-    # Usar las profundidades estándar
-    for target in standard_depths:
-        idx = find_nearest_depth(pressures, target)
-        filtered_indices.append(idx)
+    filtered_indices = nearest_indices(pressures, standard_depths)
 
     station_data = station_data.iloc[filtered_indices].copy()
 
-    # Crear la figura con 4 subplots horizontales
-    fig, (ax1, ax2, ax3, ax4) = plt.subplots(1, 4, figsize=(16, 6))
+    # Limpiar los ejes de la estación anterior
+    for ax in (ax1, ax2, ax3, ax4):
+        ax.clear()
     fig.suptitle(f'Perfiles Biogeoquímicos - Estación {station}', fontsize=14)
 
     # Plot Clorofila-a
@@ -71,16 +83,19 @@ for station in stations:
     plt.tight_layout()
 
     # Guardar figura
-    plt.savefig(f'test_outputs/bgq_profiles_{station}.png', dpi=300, bbox_inches='tight')
-    plt.close()
+    fig.savefig(f'test_outputs/bgq_profiles_{station}.png', dpi=300, bbox_inches='tight')
 
-    # Imprimir información sobre los datos
+    # Imprimir información sobre los datos: un solo volcado vectorizado
+    # con to_string en vez de re-recorrer el frame con iterrows por
+    # cada variable
     print(f"\nInformación de mediciones para estación {station}:")
     variables = ['Chl-A [ug/L]', 'nitrate', 'phosphate', 'silicate']
-    for var in variables:
-        print(f"\n{var}:")
-        print(f"Número de mediciones: {len(station_data)}")
-        print("\nValores por profundidad:")
-        for _, row in station_data.sort_values('pressure [db]').iterrows():
-            print(f"  {row['pressure [db]']:>6.1f} dbar: {row[var]:>8.3f}")
-    print("-" * 50) 
\ No newline at end of file
+    print(f"Número de mediciones: {len(station_data)}")
+    print("\nValores por profundidad:")
+    print(station_data[['pressure [db]'] + variables]
+          .sort_values('pressure [db]')
+          .to_string(index=False, float_format='%.3f'))
+    print("-" * 50)
+
+# Cerrar la figura compartida una sola vez
+plt.close(fig)
\ No newline at end of file
@@ -3,7 +3,8 @@ import pandas as pd
 import matplotlib.pyplot as plt
 from matplotlib.colors import ListedColormap
 from tensorflow.keras.models import load_model
-from scipy.interpolate import griddata, interp1d
+from scipy.interpolate import interp1d
+from scipy.spatial import cKDTree
 import joblib
 import os
 
@@ -70,24 +71,25 @@ def create_section_plot(data, model, scaler):
     predictions = model.predict(features_scaled)
     water_masses = np.argmax(predictions, axis=1)
     
-    # Interpolar predicciones
-    grid_predictions = griddata(
-        (x, y),
-        water_masses,
-        (dist_grid, depth_grid),
-        method='nearest'
-    )
-    
+    # Interpolar predicciones: una consulta vectorizada al cKDTree en
+    # vez de griddata, que reconstruye el árbol y además valida la
+    # triangulación; vecino más cercano con indexado directo equivale
+    # al method='nearest' anterior
+    tree = cKDTree(np.column_stack([x, y]))
+    _, idx = tree.query(
+        np.column_stack([dist_grid.ravel(), depth_grid.ravel()]), k=1)
+    grid_predictions = water_masses[idx].reshape(dist_grid.shape)
+
     # Interpolar batimetría
     f_bathy = interp1d(station_positions, bottom_depths, kind='cubic')
     x_bathy = np.linspace(min(distances), max(distances), 200)
     y_bathy = f_bathy(x_bathy)
-    
-    # Crear máscara para batimetría
-    bathy_mask = np.zeros_like(grid_predictions, dtype=bool)
-    for i, dist in enumerate(dist_grid[0]):
-        depth_at_dist = np.interp(dist, x_bathy, y_bathy)
-        bathy_mask[:, i] = depth_grid[:, i] > depth_at_dist
+
+    # Crear máscara para batimetría: la profundidad del fondo depende
+    # solo de la distancia, así que basta un np.interp sobre la primera
+    # fila del grid y un broadcast por columnas
+    depth_at_dist = np.interp(dist_grid[0], x_bathy, y_bathy)
+    bathy_mask = depth_grid > depth_at_dist[None, :]
     
     # Aplicar máscara
     grid_predictions = np.ma.masked_array(grid_predictions, bathy_mask)
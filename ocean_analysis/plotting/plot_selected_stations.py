@@ -1,16 +1,14 @@
-import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 import os
 
+from ocean_analysis.plotting._io import load_nut
+
 # Crear directorio de salida si no existe
 os.makedirs('test_outputs', exist_ok=True)
 
-# Leer datos de nutrientes
-df = pd.read_csv("ocean_analysis/data_tests/datosgerlache_nut.csv", 
-                 sep=';', 
-                 decimal='.', 
-                 encoding='latin-1')
+# Leer datos de nutrientes (cacheados como parquet tras la primera vez)
+df = load_nut("ocean_analysis/data_tests/datosgerlache_nut.csv")
 
 # Profundidades objetivo por estación
 station_depths = {
@@ -26,7 +24,7 @@ stations = ['GS23', 'GS26', 'GS29', 'GS34']
 # Crear una figura para cada estación
 for station in stations:
     # Filtrar datos para la estación
-    station_data = df[df['Station '] == station].copy()
+    station_data = df[df['Station'] == station].copy()
     
     # Función para encontrar el índice más cercano a una profundidad objetivo
     def find_nearest_depth(pressure_values, target):
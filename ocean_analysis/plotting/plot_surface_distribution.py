@@ -1,4 +1,3 @@
-import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 import os
@@ -6,6 +5,18 @@ import cartopy.crs as ccrs
 import cartopy.feature as cfeature
 from matplotlib.gridspec import GridSpec
 
+from ocean_analysis.plotting._io import load_nut
+
+# Rasgo de tierra compartido entre los seis mapas: crear el
+# NaturalEarthFeature dentro de la función obligaba a releer el
+# shapefile y reproyectar las geometrías en cada llamada. Materializar
+# las geometrías aquí fuerza una única lectura por corrida.
+_LAND = cfeature.NaturalEarthFeature('physical', 'land', '10m',
+                                     edgecolor='black',
+                                     facecolor='lightgray',
+                                     alpha=1)
+_LAND_GEOMS = list(_LAND.geometries())
+
 def create_distribution_map(data, parameter, title, units, cmap='YlGn', output_name=None):
     """
     Crear mapa de distribución superficial para un parámetro dado
@@ -29,12 +40,8 @@ def create_distribution_map(data, parameter, title, units, cmap='YlGn', output_n
     # Establecer límites
     ax.set_extent([lon_min, lon_max, lat_min, lat_max], crs=ccrs.PlateCarree())
 
-    # Añadir características del mapa
-    land = cfeature.NaturalEarthFeature('physical', 'land', '10m',
-                                       edgecolor='black',
-                                       facecolor='lightgray',
-                                       alpha=1)
-    ax.add_feature(land)
+    # Añadir características del mapa (rasgo compartido a nivel de módulo)
+    ax.add_feature(_LAND)
 
     # Añadir solo las etiquetas de los ejes sin ninguna grilla
     gl = ax.gridlines(draw_labels=True)
@@ -47,35 +54,43 @@ def create_distribution_map(data, parameter, title, units, cmap='YlGn', output_n
     gl.xlines = False
     gl.ylines = False
 
+    # Coordenadas y nombres como arrays: una sola extracción vectorizada
+    # en vez de desempaquetar fila a fila con iterrows
+    lons = data['Longitude [degrees East]'].to_numpy()
+    lats = data['Latitude [degrees North]'].to_numpy()
+    names = data['Station'].str.strip().to_numpy()
+
+    # Proyectar las coordenadas una sola vez: pasar
+    # transform=ccrs.PlateCarree() a cada artista dispara una
+    # transformación pyproj por llamada; con las coordenadas ya en la
+    # proyección del eje se plotea en coordenadas de datos nativas
+    xy = projection.transform_points(ccrs.PlateCarree(), lons, lats)[:, :2]
+
     # Crear scatter plot
-    scatter = ax.scatter(data['Longitude [degrees East]'],
-                        data['Latitude [degrees North]'],
+    scatter = ax.scatter(xy[:, 0],
+                        xy[:, 1],
                         c=data[parameter],
                         cmap=cmap,
                         s=150,
                         edgecolor='black',
                         linewidth=0.5,
-                        transform=ccrs.PlateCarree(),
                         zorder=5)
 
-    # Añadir etiquetas de estaciones con nombres
-    for _, row in data.iterrows():
-        # Punto de la estación
-        ax.plot(row['Longitude [degrees East]'],
-                row['Latitude [degrees North]'],
-                'o',
-                color='blue',
-                markersize=7,
-                transform=ccrs.PlateCarree(),
-                zorder=4)
-        
-        # Etiqueta de la estación
-        ax.text(row['Longitude [degrees East]'] + 0.02,
-                row['Latitude [degrees North]'] + 0.02,
-                row['Station '].strip(),
-                fontsize=8,
-                transform=ccrs.PlateCarree(),
-                zorder=6)
+    # Puntos de las estaciones: un único artista para todos los marcadores
+    ax.scatter(xy[:, 0], xy[:, 1],
+               color='blue',
+               s=49,
+               zorder=4)
+
+    # Etiquetas de las estaciones (la proyección es equirectangular, así
+    # que el offset en grados vale igual en coordenadas proyectadas);
+    # annotate sobre coordenadas de datos evita construir un transform
+    # por etiqueta
+    offsets = np.column_stack([xy[:, 0] + 0.02, xy[:, 1] + 0.02])
+    for (x, y), name in zip(offsets, names):
+        ax.annotate(name, xy=(x, y), xycoords='data',
+                    fontsize=8,
+                    zorder=6)
 
     # Configurar etiquetas
     ax.set_xlabel('Longitud (°W)', size=16)
@@ -113,11 +128,8 @@ def create_distribution_map(data, parameter, title, units, cmap='YlGn', output_n
 # Crear directorio de salida si no existe
 os.makedirs('test_outputs', exist_ok=True)
 
-# Leer datos
-df = pd.read_csv("ocean_analysis/data_tests/datosgerlache_nut.csv", 
-                 sep=';', 
-                 decimal='.', 
-                 encoding='latin-1')
+# Leer datos (cacheados como parquet tras la primera vez)
+df = load_nut("ocean_analysis/data_tests/datosgerlache_nut.csv")
 
 # Filtrar datos superficiales (0.5 dbar)
 surface_data = df[np.isclose(df['pressure [db]'], 0.5)].copy()
@@ -132,12 +144,19 @@ parameters = [
     ('dMn[nM]', 'dMn', 'nM', 'PuRd', 'dmn')
 ]
 
+# Tabla resumen: ordenar y extraer las columnas fijas una sola vez,
+# sin re-ordenar ni iterar con iterrows por cada parámetro
+surface_sorted = surface_data.sort_values('Station')
+sorted_names = surface_sorted['Station'].to_numpy()
+sorted_lats = surface_sorted['Latitude [degrees North]'].to_numpy()
+sorted_lons = surface_sorted['Longitude [degrees East]'].to_numpy()
+
 # Crear mapas para cada parámetro
 for param, title, units, cmap, output_name in parameters:
     create_distribution_map(surface_data, param, title, units, cmap, output_name)
     print(f"\nInformación de datos superficiales de {title}:")
     print("\nEstación  Latitud   Longitud   Valor")
     print("-" * 40)
-    for _, row in surface_data.sort_values('Station ').iterrows():
-        print(f"{row['Station ']:8} {row['Latitude [degrees North]']:8.3f} "
-              f"{row['Longitude [degrees East]']:9.3f} {row[param]:8.2f}") 
\ No newline at end of file
+    for name, lat, lon, value in zip(sorted_names, sorted_lats, sorted_lons,
+                                     surface_sorted[param].to_numpy()):
+        print(f"{name:8} {lat:8.3f} {lon:9.3f} {value:8.2f}") 
\ No newline at end of file
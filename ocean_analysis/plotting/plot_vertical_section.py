@@ -1,4 +1,3 @@
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import cartopy.crs as ccrs
@@ -6,6 +5,8 @@ import cartopy.feature as cfeature
 from scipy.interpolate import griddata, interp1d
 import os
 
+from ocean_analysis.plotting._io import load_nut
+
 def create_vertical_section(df, stations, variable='temperature', 
                           cmap='RdYlBu_r', title=None, highlight_value=None):
     """
@@ -23,7 +24,7 @@ def create_vertical_section(df, stations, variable='temperature',
     os.makedirs('test_outputs', exist_ok=True)
     
     # Filtrar datos para las estaciones seleccionadas
-    section_data = df[df['Station '].isin(stations)].copy()
+    section_data = df[df['Station'].isin(stations)].copy()
     
     # Calcular la distancia acumulada entre estaciones
     distances = []
@@ -35,7 +36,7 @@ def create_vertical_section(df, stations, variable='temperature',
     bottom_depths = []
     
     for station in stations:
-        station_data = section_data[section_data['Station '] == station].iloc[0]
+        station_data = section_data[section_data['Station'] == station].iloc[0]
         lat = station_data['Latitude [degrees North]']
         lon = station_data['Longitude [degrees East]']
         bottom_depths.append(station_data['Bot. Depth [m]'])
@@ -67,7 +68,7 @@ def create_vertical_section(df, stations, variable='temperature',
     z = []
     
     for station, dist in zip(stations, distances):
-        station_data = section_data[section_data['Station '] == station]
+        station_data = section_data[section_data['Station'] == station]
         for _, row in station_data.iterrows():
             x.append(dist)
             y.append(row['pressure [db]'])
@@ -149,8 +150,8 @@ def create_vertical_section(df, stations, variable='temperature',
     ax2.set_extent([lon_min, lon_max, lat_min, lat_max])
     
     # Plotear estaciones y línea de sección
-    lons = section_data.groupby('Station ')['Longitude [degrees East]'].first()
-    lats = section_data.groupby('Station ')['Latitude [degrees North]'].first()
+    lons = section_data.groupby('Station')['Longitude [degrees East]'].first()
+    lats = section_data.groupby('Station')['Latitude [degrees North]'].first()
     
     # Línea de sección
     ax2.plot(lons, lats, 'r-', transform=ccrs.PlateCarree(), linewidth=2)
@@ -160,7 +161,7 @@ def create_vertical_section(df, stations, variable='temperature',
     
     # Etiquetas de estaciones
     for station in stations:
-        station_data = section_data[section_data['Station '] == station].iloc[0]
+        station_data = section_data[section_data['Station'] == station].iloc[0]
         ax2.text(station_data['Longitude [degrees East]'] + 0.02,
                 station_data['Latitude [degrees North]'] + 0.02,
                 station,
@@ -188,11 +189,8 @@ def create_vertical_section(df, stations, variable='temperature',
     
     print(f"\nFigura guardada en: {os.path.abspath(output_path)}")
 
-# Leer datos
-df = pd.read_csv("ocean_analysis/data_tests/datosgerlache_nut.csv", 
-                 sep=';', 
-                 decimal='.', 
-                 encoding='latin-1')
+# Leer datos (cacheados como parquet tras la primera vez)
+df = load_nut("ocean_analysis/data_tests/datosgerlache_nut.csv")
 
 # Definir estaciones para la sección (siguiendo la línea roja del mapa)
 stations = ['GS29', 'GS28', 'GS27', 'GS26', 'GS25', 'GS24', 
@@ -26,6 +26,11 @@ setup(
         'inquirer>=3.1.3',
         'colorama>=0.4.6',
         'scipy>=1.11.4',
+        'numba>=0.59.0',
+        'numexpr>=2.8.0',
+        'orjson>=3.9.0',
+        'msgpack>=1.0.0',
+        'pyarrow>=14.0.0',
         'statsmodels>=0.14.0',
         'plotly>=5.18.0',
         'ipykernel>=6.27.1',